@@ -3,6 +3,7 @@ import dataclasses
 
 import os
 import snapi
+import yaml
 
 import models.cpp
 
@@ -20,7 +21,9 @@ def main():
         impl=read_specs,
         args={
             "dir_path": "spec"
-        }
+        },
+        compact_mode=snapi.CompactMode.COMPACT,
+        schema=load_schema("schema.yml")
     )
 
     g.add_transformer(
@@ -42,6 +45,11 @@ def main():
     g.run()
 
 
+def load_schema(path: str):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
 def read_specs(inputs: snapi.Inputs, dir_path: str):
     for root, dirs, files in os.walk(dir_path):
         for p in files:
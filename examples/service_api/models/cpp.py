@@ -1,29 +1,29 @@
 from typing import Any, Dict, List, Optional
 
-from dataclasses import dataclass, field
 import os
 
+import snapi.compact
 import snapi.naming
 
-@dataclass
+@snapi.compact.model
 class FunctionArg:
     name: str
     type: str
     default: Optional[str]
 
-@dataclass
+@snapi.compact.model
 class Function:
     name: str
     return_type: str
     args: List[FunctionArg]
 
-@dataclass
+@snapi.compact.model
 class Service:
     name: str
     impl_name: str
     functions: List[Function]
 
-@dataclass
+@snapi.compact.model
 class Module:
     name: str
     services: List[Service]
@@ -0,0 +1,63 @@
+"""Compare the case-conversion filters of snapi.naming with inflection.
+
+Usage, from the pkg directory: python -m benchmarks.naming [repeat]
+
+Converts a set of identifiers as a template would, i.e. the same names many times."""
+
+import sys
+import timeit
+
+import inflection
+
+from snapi import naming
+
+
+IDENTIFIERS = [
+    "list_dir", "upload", "download", "remote_path", "local_path",
+    "HTTPServer", "userID", "IPv6Address", "getUserName", "ListDirResponse",
+    "max_retry_count", "FileService", "v2_api", "fooBARBaz", "request_timeout_ms"
+]
+
+
+def inflection_snake(s):
+    return inflection.underscore(s).replace("-", "_")
+
+
+def inflection_camel(s):
+    return inflection.camelize(inflection.underscore(s), False)
+
+
+def inflection_pascal(s):
+    return inflection.camelize(inflection.underscore(s))
+
+
+def inflection_screaming(s):
+    return inflection.underscore(s).replace("-", "_").upper()
+
+
+CASES = [
+    ("snake_case", naming.snake_case, inflection_snake),
+    ("camel_case", naming.camel_case, inflection_camel),
+    ("pascal_case", naming.pascal_case, inflection_pascal),
+    ("screaming_case", naming.screaming_case, inflection_screaming),
+]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for name, fn, ref in CASES:
+        for s in IDENTIFIERS:
+            if fn(s) != ref(s):
+                print(f"{name}: mismatch for {s!r}: {fn(s)!r} != {ref(s)!r}")
+
+        t_snapi = timeit.timeit(lambda: [fn(s) for s in IDENTIFIERS], number=repeat)
+        t_ref = timeit.timeit(lambda: [ref(s) for s in IDENTIFIERS], number=repeat)
+
+        n = repeat * len(IDENTIFIERS)
+        print(f"{name:15} snapi {t_snapi / n * 1e9:8.1f} ns/call   inflection {t_ref / n * 1e9:8.1f} ns/call"
+            f"   ({t_ref / t_snapi:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+from .backends import ArchiveBackend, DirectoryBackend, MemoryBackend
+from .compact import CompactMode
+from .dedup import DedupMode
 from .generator import Generator, Outputs
 from .inputs import Inputs
 from .logging import Logger
+from .template import ReloadMode
@@ -0,0 +1,17 @@
+"""Helpers for running blocking work from asyncio code."""
+
+from typing import Any
+from collections.abc import Callable
+from concurrent.futures import Executor
+
+import asyncio
+import contextvars
+import functools
+
+
+async def run_in_executor(executor: Executor, fn: Callable[..., Any], *args) -> Any:
+    """Run fn in the executor (or the loop's default executor if None) with the current context."""
+
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args))
@@ -0,0 +1,310 @@
+"""Output backends that store generated files."""
+
+from typing import Dict, List, Optional
+from abc import ABC, abstractmethod
+
+import io
+import os
+import posixpath
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+
+
+class OutputBackend(ABC):
+    """Storage for generated files.
+
+    Backends are opened before and closed after the outputs of a run. Reads
+    return the content stored by a previous run, so sections can be preserved.
+    Writes may be called from multiple threads."""
+
+    def open(self) -> None:
+        pass
+
+
+    def close(self, commit: bool = True) -> None:
+        """Finish the run. If commit is False, the run failed and results may be discarded."""
+        pass
+
+
+    @abstractmethod
+    def read(self, path: str) -> Optional[str]:
+        """Return the existing content of a file, or None if it does not exist."""
+        pass
+
+
+    @abstractmethod
+    def write(self, path: str, content: str) -> None:
+        pass
+
+
+    def update(self, path: str, content: str) -> bool:
+        """Write content unless the file is unchanged. Returns whether it was written."""
+
+        if self.read(path) == content:
+            return False
+
+        self.write(path, content)
+        return True
+
+
+    def link(self, src: str, dst: str, content: str, symbolic: bool = False) -> bool:
+        """Store dst as a link to src, which has the given content. Returns whether dst was changed.
+
+        Backends without support for links store a copy of the content."""
+
+        return self.update(dst, content)
+
+
+    def make_dirs(self, path: str) -> None:
+        pass
+
+
+    def files(self) -> Optional[Dict[str, str]]:
+        """Return all stored files if the backend keeps them in memory."""
+        return None
+
+
+class DirectoryBackend(OutputBackend):
+    """Writes generated files to the file system."""
+
+    def __init__(self, fsync: bool = False):
+        self.fsync = fsync
+
+
+    def read(self, path: str) -> Optional[str]:
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except (IOError, UnicodeDecodeError):
+            return None
+
+
+    def write(self, path: str, content: str) -> None:
+        # Never write through links, since that would modify the other linked files as well.
+        try:
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode) or st.st_nlink > 1:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        with open(path, 'w') as f:
+            f.write(content)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+    def link(self, src: str, dst: str, content: str, symbolic: bool = False) -> bool:
+        if symbolic:
+            target = os.path.relpath(src, os.path.dirname(dst) or ".")
+            if os.path.islink(dst) and os.readlink(dst) == target:
+                return False
+        else:
+            try:
+                if not os.path.islink(dst) and os.path.samefile(src, dst):
+                    return False
+            except OSError:
+                pass
+
+        tmp_path = dst + ".tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+        if symbolic:
+            os.symlink(target, tmp_path)
+        else:
+            os.link(src, tmp_path)
+
+        os.replace(tmp_path, dst)
+        return True
+
+
+    def make_dirs(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+
+
+class MemoryBackend(OutputBackend):
+    """Keeps generated files in memory, i.e. for tests.
+
+    Files are kept between runs. The contents are returned in Generator.Stats.files."""
+
+    def __init__(self, initial: Optional[Dict[str, str]] = None):
+        self._files = dict(initial) if initial is not None else {}
+        self._lock = threading.Lock()
+
+
+    def read(self, path: str) -> Optional[str]:
+        return self._files.get(path)
+
+
+    def write(self, path: str, content: str) -> None:
+        with self._lock:
+            self._files[path] = content
+
+
+    def files(self) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return dict(self._files)
+
+
+class ArchiveBackend(OutputBackend):
+    """Streams all generated files into a single tar or zip archive.
+
+    The format is selected by suffix (.zip, .tar, .tar.gz/.tgz, .tar.xz).
+    Existing sections are read from the archive of the previous run, which is
+    replaced when the run is committed. Unchanged files are written as well,
+    since the archive is recreated on each run. Files of the previous archive
+    that were not written again, i.e. orphaned sections, are carried over."""
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+
+        self._old = None
+        self._new = None
+        self._written = set()
+        self._tmp_path = archive_path + ".tmp"
+        self._lock = threading.Lock()
+
+
+    def open(self) -> None:
+        self._written = set()
+
+        if os.path.exists(self.archive_path):
+            self._old = _open_archive(self.archive_path, "r", self.archive_path)
+
+        dir_path = os.path.dirname(self.archive_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+        self._new = _open_archive(self._tmp_path, "w", self.archive_path)
+
+
+    def close(self, commit: bool = True) -> None:
+        if commit and self._old is not None and self._new is not None:
+            for name in self._old.names():
+                if name not in self._written:
+                    self._new.write(name, self._old.read(name))
+                    self._written.add(name)
+
+        if self._old is not None:
+            self._old.close()
+            self._old = None
+
+        if self._new is not None:
+            self._new.close()
+            self._new = None
+
+            if commit:
+                os.replace(self._tmp_path, self.archive_path)
+            else:
+                os.remove(self._tmp_path)
+
+
+    def read(self, path: str) -> Optional[str]:
+        if self._old is None:
+            return None
+
+        with self._lock:
+            data = self._old.read(_archive_name(path))
+
+        return data.decode() if data is not None else None
+
+
+    def write(self, path: str, content: str) -> None:
+        name = _archive_name(path)
+
+        with self._lock:
+            self._new.write(name, content.encode())
+            self._written.add(name)
+
+
+    def update(self, path: str, content: str) -> bool:
+        changed = self.read(path) != content
+        self.write(path, content)
+        return changed
+
+
+class _ZipArchive:
+    def __init__(self, path: str, mode: str):
+        self._zip = zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED)
+
+
+    def names(self) -> List[str]:
+        return [i.filename for i in self._zip.infolist() if not i.is_dir()]
+
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            return self._zip.read(name)
+        except KeyError:
+            return None
+
+
+    def write(self, name: str, data: bytes) -> None:
+        self._zip.writestr(name, data)
+
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class _TarArchive:
+    def __init__(self, path: str, mode: str):
+        self._tar = tarfile.open(path, mode)
+
+        # extractfile(name) scans all members, so look them up by name once.
+        self._members = {}
+        if mode.startswith("r"):
+            self._members = {m.name: m for m in self._tar.getmembers() if m.isfile()}
+
+
+    def names(self) -> List[str]:
+        return list(self._members)
+
+
+    def read(self, name: str) -> Optional[bytes]:
+        member = self._members.get(name)
+        if member is None:
+            return None
+
+        f = self._tar.extractfile(member)
+        if f is None:
+            return None
+        return f.read()
+
+
+    def write(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+def _open_archive(path: str, mode: str, archive_path: str):
+    if archive_path.endswith(".zip"):
+        return _ZipArchive(path, mode)
+
+    return _TarArchive(path, mode + _tar_compression(archive_path))
+
+
+def _tar_compression(path: str) -> str:
+    if path.endswith((".tar.gz", ".tgz")):
+        return ":gz"
+    elif path.endswith(".tar.bz2"):
+        return ":bz2"
+    elif path.endswith(".tar.xz"):
+        return ":xz"
+    else:
+        return ""
+
+
+def _archive_name(path: str) -> str:
+    return posixpath.normpath(path.replace(os.sep, "/")).lstrip("/")
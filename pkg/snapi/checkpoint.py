@@ -0,0 +1,213 @@
+"""Checkpoint journal that lets a failed run resume where it stopped."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+
+class Checkpoint:
+    """Journal of completed input groups, transformer results and output files.
+
+    The journal is a JSON Lines file in the checkpoint directory, transformer results
+    are stored next to it as pickle files. Entries are only reused if the input files
+    they were computed from, the delegate's code and its arguments, and for outputs
+    the template file and data are unchanged. Files added to an input directory,
+    changes of included templates or of functions called by a delegate are not
+    detected, and delegates without a qualified name are never checkpointed."""
+
+    JOURNAL_FILE = "journal.jsonl"
+
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+
+        self._inputs = {}
+        self._transformers = {}
+        self._outputs = {}
+        self._journal = None
+        self._lock = threading.Lock()
+
+
+    def begin(self, resume: bool) -> None:
+        """Open the journal, either continuing the previous one or starting over."""
+
+        self._inputs = {}
+        self._transformers = {}
+        self._outputs = {}
+
+        if resume:
+            self._load()
+        else:
+            self.clear()
+
+        os.makedirs(self.dir_path, exist_ok=True)
+        self._journal = open(os.path.join(self.dir_path, self.JOURNAL_FILE), 'a')
+
+
+    def end(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+    def clear(self) -> None:
+        """Remove all checkpoint data, i.e. after a successful run.
+
+        Only the files written by the checkpoint are removed, and the directory
+        itself only if it is empty afterwards."""
+
+        self.end()
+
+        try:
+            names = os.listdir(self.dir_path)
+        except OSError:
+            return
+
+        for name in names:
+            if name.startswith(self.JOURNAL_FILE) or (name.startswith("tr_") and ".pickle" in name):
+                try:
+                    os.remove(os.path.join(self.dir_path, name))
+                except OSError:
+                    pass
+
+        try:
+            os.rmdir(self.dir_path)
+        except OSError:
+            pass
+
+
+    def record_input(self, name: str, decl_key: str, paths: List[str]) -> None:
+        fingerprint = _fingerprint(decl_key, paths)
+        self._inputs[name] = fingerprint
+        self._append({"type": "input", "name": name, "fingerprint": fingerprint})
+
+
+    def record_transformer(self, name: str, decl_key: str, inputs: str, result: Any) -> None:
+        fingerprint = self._inputs.get(inputs)
+        if fingerprint is None:
+            return
+
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+
+        path = self._transformer_path(name)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+        entry = {"decl_key": decl_key, "input_digest": _digest(fingerprint)}
+        self._transformers[name] = entry
+        self._append({"type": "transformer", "name": name, **entry})
+
+
+    def load_transformer(self, name: str, decl_key: str, inputs: str, inputs_decl_key: str) -> Tuple[bool, Any]:
+        """Return (True, result) if a valid result of the transformer was recorded."""
+
+        entry = self._transformers.get(name)
+        fingerprint = self._inputs.get(inputs)
+
+        if entry is None or fingerprint is None or entry["decl_key"] != decl_key:
+            return False, None
+
+        if fingerprint[0] != inputs_decl_key:
+            return False, None
+
+        if entry["input_digest"] != _digest(fingerprint) or not _is_current(fingerprint):
+            return False, None
+
+        try:
+            with open(self._transformer_path(name), 'rb') as f:
+                return True, pickle.load(f)
+        except Exception:
+            return False, None
+
+
+    def output_key(self, template_path: str, data: Any) -> Optional[str]:
+        """Return a key identifying the rendered content of an output, or None if data cannot be hashed."""
+
+        try:
+            mtime = os.stat(template_path).st_mtime_ns
+            data_bytes = pickle.dumps(data, protocol=4)
+        except Exception:
+            return None
+
+        return f"{template_path}:{mtime}:{hashlib.sha256(data_bytes).hexdigest()}"
+
+
+    def record_output(self, path: str, key: str, content: str) -> None:
+        entry = [key, _content_digest(content)]
+        self._outputs[path] = entry
+        self._append({"type": "output", "path": path, "key": key, "digest": entry[1]})
+
+
+    def is_output_done(self, path: str, key: str, content: str) -> bool:
+        """Return whether the output was recorded with the given key and content.
+
+        Checking the content ensures the file was actually kept by the output
+        backend, i.e. an archive backend discards the writes of a failed run."""
+
+        return self._outputs.get(path) == [key, _content_digest(content)]
+
+
+    def _load(self) -> None:
+        try:
+            with open(os.path.join(self.dir_path, self.JOURNAL_FILE), 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Incomplete last line of an aborted run.
+                        continue
+
+                    kind = record.pop("type")
+                    if kind == "input":
+                        self._inputs[record["name"]] = record["fingerprint"]
+                    elif kind == "transformer":
+                        self._transformers[record.pop("name")] = record
+                    elif kind == "output":
+                        self._outputs[record["path"]] = [record["key"], record.get("digest")]
+        except IOError:
+            pass
+
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._journal is None:
+            return
+
+        with self._lock:
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+
+
+    def _transformer_path(self, name: str) -> str:
+        return os.path.join(self.dir_path, f"tr_{_digest(name)}.pickle")
+
+
+def _fingerprint(decl_key: str, paths: List[str]) -> List[Any]:
+    files = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            files.append([p, st.st_mtime_ns, st.st_size])
+        except OSError:
+            files.append([p, None, None])
+
+    return [decl_key, files]
+
+
+def _is_current(fingerprint: List[Any]) -> bool:
+    decl_key, files = fingerprint
+    return _fingerprint(decl_key, [p for p, _, _ in files]) == fingerprint
+
+
+def _digest(o: Any) -> str:
+    return hashlib.sha256(json.dumps(o).encode()).hexdigest()
+
+
+def _content_digest(s: str) -> str:
+    return hashlib.sha256(s.encode()).hexdigest()
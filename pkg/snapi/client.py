@@ -0,0 +1,50 @@
+"""Thin client for a generator hosted with snapi.daemon.
+
+Only depends on the standard library, so it can be run as a script without
+importing the rest of the package:
+
+    python snapi/client.py <socket_path> [regenerate|ping|shutdown]"""
+
+from typing import Any, Dict
+
+import json
+import socket
+import sys
+
+
+def request(socket_path: str, command: str) -> Dict[str, Any]:
+    """Send a command to the daemon and return its response."""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        s.sendall(json.dumps({"command": command}).encode() + b"\n")
+
+        with s.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def regenerate(socket_path: str) -> Dict[str, Any]:
+    """Request a generator run; the response contains stats and changed files."""
+
+    return request(socket_path, "regenerate")
+
+
+def main(argv) -> int:
+    if len(argv) < 2:
+        print(f"usage: {argv[0]} <socket_path> [regenerate|ping|shutdown]", file=sys.stderr)
+        return 2
+
+    command = argv[2] if len(argv) > 2 else "regenerate"
+    response = request(argv[1], command)
+
+    if not response.get("ok"):
+        print(response.get("error"), file=sys.stderr)
+        return 1
+
+    for path in response.get("changed_files", []):
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
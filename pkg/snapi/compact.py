@@ -0,0 +1,137 @@
+"""Compact, memory-efficient representations of input and model data."""
+
+from typing import Any, Iterator
+from collections.abc import Mapping
+from enum import Enum
+
+import dataclasses
+import sys
+
+
+class CompactMode(Enum):
+    """Representations supported for parsed input data.
+
+    COMPACT interns strings and stores lists as tuples, which uses the least memory.
+    FROZEN also wraps dicts in FrozenDict so the data is hashable, i.e. for use as
+    cache keys. The wrappers add to the size, so FROZEN data takes more memory
+    than COMPACT data."""
+    OFF = 1
+    COMPACT = 2
+    FROZEN = 3
+
+
+class FrozenDict(Mapping):
+    """Immutable, hashable mapping."""
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+        self._hash = None
+
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data[key]
+
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._data)
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._data.items()))
+        return self._hash
+
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({self._data!r})"
+
+
+def compact(data: Any, mode: CompactMode = CompactMode.COMPACT) -> Any:
+    """Convert parsed data to a compact representation.
+
+    Strings are interned and lists are converted to tuples.
+    With CompactMode.FROZEN, dicts are converted to FrozenDict as well."""
+
+    if mode == CompactMode.OFF:
+        return data
+
+    return _compact_impl(data, mode == CompactMode.FROZEN)
+
+
+def model(cls=None, **kwargs):
+    """Dataclass decorator that adds __slots__ for all fields.
+
+    Accepts the same arguments as dataclasses.dataclass."""
+
+    def wrap(cls):
+        return _make_slotted(dataclasses.dataclass(cls, **kwargs))
+
+    if cls is None:
+        return wrap
+
+    return wrap(cls)
+
+
+def _compact_impl(data: Any, frozen: bool) -> Any:
+    if isinstance(data, str):
+        return sys.intern(data)
+    elif isinstance(data, dict):
+        d = {_compact_impl(k, frozen): _compact_impl(v, frozen) for k, v in data.items()}
+        return FrozenDict(d) if frozen else d
+    elif isinstance(data, (list, tuple)):
+        return tuple(_compact_impl(v, frozen) for v in data)
+    else:
+        return data
+
+
+def _make_slotted(cls):
+    if "__slots__" in cls.__dict__:
+        return cls
+
+    names = tuple(f.name for f in dataclasses.fields(cls))
+
+    ns = dict(cls.__dict__)
+    ns["__slots__"] = names
+    ns.pop("__dict__", None)
+    ns.pop("__weakref__", None)
+    for name in names:
+        ns.pop(name, None)
+
+    qualname = getattr(cls, "__qualname__", None)
+    old_cls = cls
+    cls = type(cls)(cls.__name__, cls.__bases__, ns)
+    if qualname is not None:
+        cls.__qualname__ = qualname
+
+    # Methods using zero-argument super() refer to the class through a __class__ cell.
+    for value in ns.values():
+        for fn in _functions_of(value):
+            _update_class_cell(fn, old_cls, cls)
+
+    return cls
+
+
+def _functions_of(value: Any) -> Iterator[Any]:
+    if isinstance(value, (classmethod, staticmethod)):
+        value = value.__func__
+
+    if isinstance(value, property):
+        yield from (f for f in (value.fget, value.fset, value.fdel) if f is not None)
+    elif hasattr(value, "__code__"):
+        yield value
+
+
+def _update_class_cell(fn: Any, old_cls: type, new_cls: type) -> None:
+    closure = getattr(fn, "__closure__", None)
+    if closure is None:
+        return
+
+    for name, cell in zip(fn.__code__.co_freevars, closure):
+        if name == "__class__" and cell.cell_contents is old_cls:
+            cell.cell_contents = new_cls
@@ -0,0 +1,84 @@
+"""Persistent generator process that accepts requests over a local Unix socket."""
+
+from typing import Any, Dict
+
+import dataclasses
+import json
+import os
+import socket
+import socketserver
+
+from .errors import GeneratorError
+from .generator import Generator
+
+
+def serve(generator: Generator, socket_path: str) -> None:
+    """Host a generator and handle requests on the given Unix socket until shutdown.
+
+    Requests and responses are single-line JSON objects, see snapi.client.
+    Templates and caches of the generator stay warm between requests;
+    keep_input_cache=True should be set on the generator to avoid re-parsing
+    unchanged inputs.
+
+    Fails if another daemon is already listening on the socket. A stale socket
+    file of a daemon that is no longer running is replaced."""
+
+    state = {"running": True}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                # Connection without a request, i.e. a liveness check.
+                return
+
+            try:
+                request = json.loads(line)
+                response = _handle_request(generator, request, state)
+            except Exception as e:
+                generator.log.error(f"request failed: {e}")
+                response = {"ok": False, "error": str(e)}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            raise GeneratorError(f"another daemon is already listening on '{socket_path}'")
+        os.remove(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        generator.log.info(f"Listening on '{socket_path}'")
+        try:
+            while state["running"]:
+                server.handle_request()
+        finally:
+            os.remove(socket_path)
+
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(1.0)
+        try:
+            s.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def _handle_request(generator: Generator, request: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    command = request.get("command")
+
+    if command == "regenerate":
+        stats = generator.run()
+        return {
+            "ok": True,
+            "stats": dataclasses.asdict(stats),
+            "changed_files": stats.written_files()
+        }
+    elif command == "ping":
+        return {"ok": True}
+    elif command == "shutdown":
+        state["running"] = False
+        return {"ok": True}
+    else:
+        raise GeneratorError(f"unknown command '{command}'")
@@ -0,0 +1,72 @@
+"""Content-addressed deduplication of rendered outputs."""
+
+from typing import Any, Optional, Tuple
+from concurrent.futures import Future
+from enum import Enum
+
+import hashlib
+import pickle
+import threading
+
+
+class DedupMode(Enum):
+    """Deduplication strategies for generated files.
+
+    RENDER only renders identical (template, data) pairs once. HARDLINK and
+    SYMLINK additionally store identical contents once and link the duplicates."""
+    OFF = 1
+    RENDER = 2
+    HARDLINK = 3
+    SYMLINK = 4
+
+
+class DedupCache:
+    """Rendered contents and stored files of a single run, shared by all output groups."""
+
+    def __init__(self, mode: DedupMode):
+        self.mode = mode
+        self._renders = {}
+        self._contents = {}
+        self._lock = threading.Lock()
+
+
+    @property
+    def links(self) -> bool:
+        return self.mode in (DedupMode.HARDLINK, DedupMode.SYMLINK)
+
+
+    def render_key(self, template_path: str, data: Any) -> Optional[str]:
+        """Return a key for the rendered content of template and data, or None if data cannot be hashed."""
+
+        try:
+            data_bytes = pickle.dumps(data, protocol=4)
+        except Exception:
+            return None
+
+        h = hashlib.sha256(template_path.encode())
+        h.update(b"\0")
+        h.update(data_bytes)
+        return h.hexdigest()
+
+
+    def get_render(self, key: str) -> Optional[str]:
+        return self._renders.get(key)
+
+
+    def add_render(self, key: str, content: str) -> None:
+        self._renders[key] = content
+
+
+    def claim_content(self, path: str, content: str) -> Tuple[str, Future]:
+        """Return the canonical path for content, and a future that completes once it is written.
+
+        If path becomes the canonical path, the caller must complete the future."""
+
+        digest = hashlib.sha256(content.encode()).digest()
+
+        with self._lock:
+            entry = self._contents.get(digest)
+            if entry is None:
+                entry = (path, Future())
+                self._contents[digest] = entry
+            return entry
@@ -0,0 +1,284 @@
+"""Semantic diff of API specs based on Merkle-hashed entity trees.
+
+Specs are expected in the common layout of modules -> services -> functions -> args:
+
+    services:
+      - name: files
+        functions:
+          - name: list_dir
+            args:
+              - remote_path: string = "/"
+            returns: list<string>
+
+Each entity is hashed over its own attributes and the hashes of its children,
+so unchanged subtrees are skipped by comparing a single hash. The tree of a
+baseline spec can be saved with save_tree, so that later comparisons only need
+to hash the new spec:
+
+    old = diff.load_tree("api_baseline.json")
+    changes = diff.diff(old, diff.hash_spec(new_input_data))"""
+
+from typing import Any, Dict, List, Tuple
+from collections.abc import Mapping
+
+from dataclasses import dataclass, field
+
+import hashlib
+import json
+import os
+
+from . import naming
+from .errors import GeneratorError
+
+
+# Attribute changes that break callers. All other attribute changes,
+# i.e. of descriptions, are reported as non-breaking.
+BREAKING_ATTRS = {
+    "function": ("returns",),
+    "arg": ("type", "position")
+}
+
+
+@dataclass
+class Node:
+    """Hashed entity of a spec."""
+
+    kind: str
+    name: str
+    attrs_hash: str
+    hash: str
+    children: Dict[str, "Node"] = field(default_factory=dict)
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Change:
+    """Difference between two versions of an entity."""
+
+    kind: str
+    path: str
+    entity: str
+    breaking: bool
+    attrs: List[str] = field(default_factory=list)
+
+
+def hash_spec(input_data: Dict[str, Any]) -> Node:
+    """Build a hashed entity tree from input data, i.e. {path: module_spec} as produced by Inputs.
+
+    Module names are taken from a top-level name attribute, or from the file name."""
+
+    modules = {}
+
+    for path, module_spec in input_data.items():
+        if module_spec is None:
+            continue
+
+        name = module_spec.get("name") or os.path.basename(path).split(".")[0]
+        modules[name] = _hash_module(name, module_spec)
+
+    return _make_node("spec", "", {}, modules)
+
+
+def diff(old: Node, new: Node) -> List[Change]:
+    """Compare two hashed entity trees top-down and return the changes."""
+
+    changes = []
+    _diff_impl(old, new, "", changes)
+    return changes
+
+
+def diff_inputs(old: Dict[str, Any], new: Dict[str, Any]) -> List[Change]:
+    """Hash and compare two versions of input data."""
+
+    return diff(hash_spec(old), hash_spec(new))
+
+
+def is_backward_compatible(changes: List[Change]) -> bool:
+    return not any(c.breaking for c in changes)
+
+
+def normalize_type(s: str) -> str:
+    """Return a canonical form of a type expression, i.e. without whitespace.
+
+    Types that are not fully parsed as nested type expressions, i.e. string[] or
+    std::string, are kept verbatim with collapsed whitespace."""
+
+    verbatim = " ".join(s.split())
+
+    try:
+        normalized = naming.convert_type(s, mapper=lambda x: x, delims=("<", ">"))
+    except GeneratorError:
+        return verbatim
+
+    # The parser stops at unknown characters, so make sure nothing was dropped.
+    if normalized != "".join(s.split()):
+        return verbatim
+
+    return normalized
+
+
+def save_tree(node: Node, path: str) -> None:
+    """Save a hashed entity tree, i.e. of a baseline spec, as JSON."""
+
+    with open(path, 'w') as f:
+        json.dump(_node_to_json(node), f, default=_to_json)
+
+
+def load_tree(path: str) -> Node:
+    """Load a hashed entity tree saved with save_tree."""
+
+    with open(path, 'r') as f:
+        return _node_from_json(json.load(f))
+
+
+def _hash_module(name: str, module_spec: Mapping) -> Node:
+    services = {}
+    for service_spec in module_spec.get("services") or ():
+        s = _hash_service(service_spec)
+        services[s.name] = s
+
+    attrs = _other_attrs(module_spec, ("name", "services"))
+
+    return _make_node("module", name, attrs, services)
+
+
+def _hash_service(service_spec: Mapping) -> Node:
+    functions = {}
+    for function_spec in service_spec.get("functions") or ():
+        f = _hash_function(function_spec)
+        functions[f.name] = f
+
+    attrs = _other_attrs(service_spec, ("name", "functions"))
+
+    return _make_node("service", service_spec["name"], attrs, functions)
+
+
+def _hash_function(function_spec: Mapping) -> Node:
+    args = {}
+    for position, arg_spec in enumerate(function_spec.get("args") or ()):
+        a = _hash_arg(arg_spec, position)
+        args[a.name] = a
+
+    attrs = _other_attrs(function_spec, ("name", "args", "returns"))
+    attrs["returns"] = normalize_type(function_spec.get("returns", "void"))
+
+    return _make_node("function", function_spec["name"], attrs, args)
+
+
+def _hash_arg(arg_spec: Mapping, position: int) -> Node:
+    if "name" in arg_spec:
+        name = arg_spec["name"]
+        type_spec = arg_spec.get("type", "")
+        default = arg_spec.get("default")
+        attrs = _other_attrs(arg_spec, ("name", "type", "default"))
+    else:
+        name, type_and_default = next(iter(arg_spec.items()))
+        parts = type_and_default.split("=", 1)
+        type_spec = parts[0].strip()
+        default = parts[1].strip() if len(parts) == 2 else None
+        attrs = {}
+
+    attrs["type"] = normalize_type(type_spec)
+    attrs["default"] = default
+    attrs["position"] = position
+
+    return _make_node("arg", name, attrs, {})
+
+
+def _other_attrs(spec: Mapping, known: Tuple[str, ...]) -> Dict[str, Any]:
+    return {k: v for k, v in spec.items() if k not in known}
+
+
+def _make_node(kind: str, name: str, attrs: Dict[str, Any], children: Dict[str, Node]) -> Node:
+    attrs_hash = _digest(_canonical([kind, name, attrs]))
+
+    h = hashlib.blake2b(attrs_hash.encode(), digest_size=16)
+    for child_name in sorted(children):
+        h.update(b"\0")
+        h.update(children[child_name].hash.encode())
+
+    return Node(
+        kind=kind,
+        name=name,
+        attrs_hash=attrs_hash,
+        hash=h.hexdigest(),
+        children=children,
+        attrs=attrs
+    )
+
+
+def _diff_impl(old: Node, new: Node, path: str, changes: List[Change]) -> None:
+    if old.hash == new.hash:
+        return
+
+    if old.attrs_hash != new.attrs_hash and path:
+        changed_attrs = _changed_attrs(old.attrs, new.attrs)
+        breaking = any(_is_breaking_attr_change(new.kind, k, old.attrs, new.attrs) for k in changed_attrs)
+        changes.append(Change(kind="changed", path=path, entity=new.kind, breaking=breaking, attrs=changed_attrs))
+
+    for name, old_child in old.children.items():
+        child_path = f"{path}/{name}" if path else name
+        new_child = new.children.get(name)
+
+        if new_child is None:
+            changes.append(Change(kind="removed", path=child_path, entity=old_child.kind, breaking=True))
+        else:
+            _diff_impl(old_child, new_child, child_path, changes)
+
+    for name, new_child in new.children.items():
+        if name not in old.children:
+            child_path = f"{path}/{name}" if path else name
+            breaking = new_child.kind == "arg" and new_child.attrs.get("default") is None
+            changes.append(Change(kind="added", path=child_path, entity=new_child.kind, breaking=breaking))
+
+
+def _changed_attrs(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    return sorted(k for k in set(old) | set(new) if _canonical(old.get(k)) != _canonical(new.get(k)))
+
+
+def _is_breaking_attr_change(kind: str, key: str, old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    if kind == "arg" and key == "default":
+        # Removing a default breaks callers that omit the arg, adding or changing one does not.
+        return old.get("default") is not None and new.get("default") is None
+
+    return key in BREAKING_ATTRS.get(kind, ())
+
+
+def _canonical(v: Any) -> str:
+    return json.dumps(v, sort_keys=True, default=_to_json)
+
+
+def _node_to_json(node: Node) -> Dict[str, Any]:
+    return {
+        "kind": node.kind,
+        "name": node.name,
+        "attrs_hash": node.attrs_hash,
+        "hash": node.hash,
+        "attrs": node.attrs,
+        "children": [_node_to_json(c) for c in node.children.values()]
+    }
+
+
+def _node_from_json(d: Dict[str, Any]) -> Node:
+    children = [_node_from_json(c) for c in d["children"]]
+
+    return Node(
+        kind=d["kind"],
+        name=d["name"],
+        attrs_hash=d["attrs_hash"],
+        hash=d["hash"],
+        children={c.name: c for c in children},
+        attrs=d["attrs"]
+    )
+
+
+def _digest(s: str) -> str:
+    return hashlib.blake2b(s.encode(), digest_size=16).hexdigest()
+
+
+def _to_json(o: Any) -> Any:
+    if isinstance(o, Mapping):
+        return dict(o)
+    if isinstance(o, (tuple, set, frozenset)):
+        return list(o)
+    return str(o)
@@ -0,0 +1,208 @@
+"""Discovery of input files with include/exclude glob patterns.
+
+Patterns use / as separator and are matched against paths relative to the
+searched directory. * and ? do not match /, ** matches any number of directories.
+Patterns without a / match the name of a file or directory at any depth, similar
+to .gitignore, i.e. "*.yml" or "node_modules".
+
+Excluded directories are pruned without being listed. An optional snapshot file
+stores the matching entries of each directory together with its mtime, so that
+unchanged directories are not listed again on subsequent runs. Directories that
+were modified shortly before the snapshot was taken are always listed again, as
+a later change within the mtime resolution of the file system would go unnoticed."""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import json
+import os
+import re
+import time
+
+
+# Snapshot entries with an mtime this close to the snapshot time are not trusted.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class Matcher:
+    """Compiled set of glob patterns."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = tuple(patterns)
+
+        path_patterns = [_glob_to_regex(p) for p in self.patterns if "/" in p]
+        name_patterns = [_glob_to_regex(p) for p in self.patterns if "/" not in p]
+
+        self._path_re = _compile_any(path_patterns)
+        self._name_re = _compile_any(name_patterns)
+
+
+    def match(self, rel_path: str, name: str) -> bool:
+        if self._name_re is not None and self._name_re.fullmatch(name):
+            return True
+        return self._path_re is not None and self._path_re.fullmatch(rel_path) is not None
+
+
+    def match_dir(self, rel_path: str, name: str) -> bool:
+        # Also test with a trailing / so that "vendor/**" excludes the vendor directory itself.
+        return self.match(rel_path, name) or self.match(rel_path + "/", name)
+
+
+def find_files(
+    dir_path: str,
+    include: Iterable[str] = ("*",),
+    exclude: Iterable[str] = (),
+    recursive: bool = True,
+    snapshot_path: Optional[str] = None
+) -> List[str]:
+    """Return the sorted paths of all files in dir_path that match include but not exclude."""
+
+    include = Matcher(include)
+    exclude = Matcher(exclude)
+
+    config = [os.path.abspath(dir_path), include.patterns, exclude.patterns, recursive]
+    snapshot, snapshot_time = {}, 0
+    if snapshot_path is not None:
+        snapshot, snapshot_time = _load_snapshot(snapshot_path, config)
+
+    new_snapshot = {}
+    new_snapshot_time = time.time_ns()
+    racy = False
+
+    result = []
+    pending = [""]
+
+    while pending:
+        rel_dir = pending.pop()
+        abs_dir = os.path.join(dir_path, rel_dir) if rel_dir else dir_path
+
+        try:
+            mtime = os.stat(abs_dir).st_mtime_ns
+        except OSError:
+            continue
+
+        entry = snapshot.get(rel_dir)
+        if entry is not None and mtime >= snapshot_time - RACY_WINDOW_NS:
+            entry = None
+            racy = True
+
+        if entry is None or entry[0] != mtime:
+            files, dirs = _scan_dir(abs_dir, rel_dir, include, exclude, recursive)
+            entry = (mtime, files, dirs)
+
+        new_snapshot[rel_dir] = entry
+
+        _, files, dirs = entry
+        result.extend(os.path.join(abs_dir, name) for name in files)
+        pending.extend(_join_rel(rel_dir, name) for name in dirs)
+
+    # Also save after rescanning racy entries, so that they are trusted once they are old enough.
+    if snapshot_path is not None and (racy or new_snapshot != snapshot):
+        _save_snapshot(snapshot_path, config, new_snapshot_time, new_snapshot)
+
+    result.sort()
+    return result
+
+
+def _scan_dir(
+    abs_dir: str,
+    rel_dir: str,
+    include: Matcher,
+    exclude: Matcher,
+    recursive: bool
+) -> Tuple[List[str], List[str]]:
+    files = []
+    dirs = []
+
+    try:
+        it = os.scandir(abs_dir)
+    except OSError:
+        return files, dirs
+
+    with it:
+        for e in it:
+            rel_path = _join_rel(rel_dir, e.name)
+
+            try:
+                # Like os.walk, symlinks to directories are not followed.
+                if e.is_dir(follow_symlinks=False):
+                    if recursive and not exclude.match_dir(rel_path, e.name):
+                        dirs.append(e.name)
+                elif e.is_file():
+                    if include.match(rel_path, e.name) and not exclude.match(rel_path, e.name):
+                        files.append(e.name)
+            except OSError:
+                continue
+
+    return files, dirs
+
+
+def _join_rel(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def _glob_to_regex(pattern: str) -> str:
+    pattern = pattern.lstrip("/")
+    parts = []
+    i = 0
+    n = len(pattern)
+
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif c == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif c == "?":
+            parts.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j < 0:
+                parts.append(re.escape(c))
+                i += 1
+            else:
+                cls = pattern[i + 1:j]
+                if cls.startswith("!"):
+                    cls = "^" + cls[1:]
+                parts.append("[" + cls.replace("\\", "\\\\") + "]")
+                i = j + 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+
+    return "".join(parts)
+
+
+def _compile_any(regexes: List[str]) -> Optional["re.Pattern"]:
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+
+def _load_snapshot(path: str, config: List[Any]) -> Tuple[Dict[str, Any], int]:
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (IOError, ValueError):
+        return {}, 0
+
+    if data.get("config") != json.loads(json.dumps(config)):
+        return {}, 0
+
+    return {k: tuple(v) for k, v in data.get("dirs", {}).items()}, data.get("time", 0)
+
+
+def _save_snapshot(path: str, config: List[Any], snapshot_time: int, snapshot: Dict[str, Any]) -> None:
+    dir_path = os.path.dirname(path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"config": config, "time": snapshot_time, "dirs": snapshot}, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,136 @@
+"""Registry of input file formats and their parsers."""
+
+from typing import Any, BinaryIO, Optional, Tuple, Union
+from collections.abc import Callable, Iterator
+
+import json
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+Parser = Callable[[bytes], Any]
+StreamParser = Callable[[BinaryIO], Iterator[Any]]
+
+
+class FormatRegistry:
+    """Maps file suffixes to parsers.
+
+    A parser receives the raw file content and returns the parsed data.
+    An optional stream parser receives the open file and yields records one
+    at a time; it is used for streaming inputs.
+    Each format has a name that is used to aggregate parse statistics."""
+
+    def __init__(self):
+        self._formats = {}
+
+
+    def register(
+        self,
+        suffix: Union[str, Tuple[str, ...]],
+        parser: Parser,
+        name: Optional[str] = None,
+        stream_parser: Optional[StreamParser] = None
+    ) -> None:
+        """Register a parser for one or more file suffixes, replacing existing ones."""
+
+        suffixes = (suffix,) if isinstance(suffix, str) else suffix
+        for s in suffixes:
+            self._formats[s] = (name or s.lstrip("."), parser, stream_parser)
+
+
+    def lookup(self, path: str) -> Optional[Tuple[str, Parser]]:
+        """Return (name, parser) for the longest registered suffix of path, if any."""
+
+        entry = self._lookup_entry(path)
+        if entry is None:
+            return None
+
+        return entry[0], entry[1]
+
+
+    def lookup_stream(self, path: str) -> Optional[Tuple[str, StreamParser]]:
+        """Return (name, stream_parser) for the longest registered suffix of path, if any.
+
+        Formats without a stream parser yield the whole document as a single record."""
+
+        entry = self._lookup_entry(path)
+        if entry is None:
+            return None
+
+        name, parser, stream_parser = entry
+        if stream_parser is None:
+            stream_parser = lambda f: iter([parser(f.read())])
+
+        return name, stream_parser
+
+
+    def suffixes(self) -> Tuple[str, ...]:
+        return tuple(self._formats.keys())
+
+
+    def copy(self) -> "FormatRegistry":
+        r = FormatRegistry()
+        r._formats = dict(self._formats)
+        return r
+
+
+    def _lookup_entry(self, path: str):
+        match = None
+        for suffix, entry in self._formats.items():
+            if path.endswith(suffix) and (match is None or len(suffix) > len(match[0])):
+                match = (suffix, entry)
+
+        return match[1] if match is not None else None
+
+
+def parse_json(content: bytes) -> Any:
+    """Parse JSON, using orjson if installed."""
+
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def parse_json_lines(content: bytes) -> Any:
+    """Parse JSON Lines into a list of records."""
+
+    return [parse_json(line) for line in content.splitlines() if line.strip()]
+
+
+def stream_json_lines(f: BinaryIO) -> Iterator[Any]:
+    """Yield records from JSON Lines one at a time."""
+
+    for line in f:
+        if line.strip():
+            yield parse_json(line)
+
+
+def parse_yaml(content: bytes) -> Any:
+    """Parse YAML with the safe loader, using the LibYAML-based loader if available."""
+
+    return yaml.load(content, Loader=_YAMLLoader)
+
+
+def stream_yaml(f: BinaryIO) -> Iterator[Any]:
+    """Yield documents from a multi-document YAML stream one at a time."""
+
+    return yaml.load_all(f, Loader=_YAMLLoader)
+
+
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def make_default_registry() -> FormatRegistry:
+    r = FormatRegistry()
+    r.register(".json", parse_json, "json")
+    r.register((".jsonl", ".ndjson"), parse_json_lines, "jsonl", stream_json_lines)
+    r.register((".yaml", ".yml"), parse_yaml, "yaml", stream_yaml)
+    return r
+
+
+default_formats = make_default_registry()
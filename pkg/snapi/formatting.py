@@ -0,0 +1,147 @@
+"""Post-processing of generated content with external formatter commands."""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from concurrent.futures import ThreadPoolExecutor
+
+import hashlib
+import json
+import os
+import subprocess
+
+from . import logging
+
+
+class PostProcessor:
+    """Runs formatter commands on generated content and caches the results by content hash.
+
+    Formatters map file suffixes to commands that read the unformatted content
+    from stdin and write the formatted content to stdout. The placeholder {path}
+    in a command argument is substituted with the output path."""
+
+    def __init__(
+        self,
+        formatters: Dict[Union[str, Tuple[str, ...]], List[str]],
+        cache_path: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.formatters = formatters
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+
+        self._cache = {}
+        self._used_keys = set()
+        self._cache_loaded = False
+        self._cache_changed = False
+
+
+    def select(self, path: str) -> Optional[List[str]]:
+        """Return the formatter command for the given output path, if any."""
+
+        for suffix, command in self.formatters.items():
+            if path.endswith(suffix):
+                return [arg.replace("{path}", path) for arg in command]
+        return None
+
+
+    def format_batch(
+        self,
+        items: List[Tuple[str, str, List[str]]],
+        log: logging.ILogger
+    ) -> Tuple[List[Optional[str]], int]:
+        """Format (path, content, command) items in parallel.
+
+        Returns the formatted contents in the same order and the number of cache hits.
+        If a formatter fails, the error is logged and the content is None."""
+
+        self._load_cache()
+
+        results = [None] * len(items)
+        pending = []
+
+        for i, (path, content, command) in enumerate(items):
+            key = _make_key(command, content)
+            self._used_keys.add(key)
+
+            cached = self._cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, key))
+
+        def run_formatter(i):
+            path, content, command = items[i]
+            try:
+                p = subprocess.run(command, input=content, capture_output=True, text=True)
+            except OSError as e:
+                return None, f"formatter '{command[0]}' failed for '{path}': {e}"
+
+            if p.returncode != 0:
+                reason = p.stderr.strip() or f"exit code {p.returncode}"
+                return None, f"formatter '{command[0]}' failed for '{path}': {reason}"
+            return p.stdout, None
+
+        if len(pending) > 0:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                outcomes = executor.map(run_formatter, [i for i, _ in pending])
+
+                for (i, key), (formatted, error) in zip(pending, outcomes):
+                    if error is not None:
+                        log.error(error)
+                    else:
+                        results[i] = formatted
+                        self._cache[key] = formatted
+                        self._cache_changed = True
+
+        return results, len(items) - len(pending)
+
+
+    def save_cache(self) -> None:
+        """Persist cache entries used in this run; unused entries are dropped.
+
+        The cache file is only written if entries were added or dropped."""
+
+        if not self._cache_loaded:
+            return
+
+        used = {k: v for k, v in self._cache.items() if k in self._used_keys}
+        changed = self._cache_changed or len(used) != len(self._cache)
+
+        self._cache = used
+        self._used_keys = set()
+        self._cache_changed = False
+
+        if self.cache_path is None or not changed:
+            return
+
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+    def _load_cache(self) -> None:
+        if self._cache_loaded:
+            return
+        self._cache_loaded = True
+
+        if self.cache_path is None:
+            return
+
+        try:
+            with open(self.cache_path, 'r') as f:
+                self._cache = json.load(f)
+        except (IOError, ValueError):
+            self._cache = {}
+
+
+def _make_key(command: List[str], content: str) -> str:
+    h = hashlib.sha256()
+    h.update("\0".join(command).encode())
+    h.update(b"\0\0")
+    h.update(content.encode())
+    return h.hexdigest()
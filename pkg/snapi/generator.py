@@ -1,35 +1,89 @@
 """The main generator class and supporting definitions."""
 
-from typing import Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from collections import deque
 from collections.abc import Callable
 
-from dataclasses import dataclass
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 
+import asyncio
+import functools
+import hashlib
+import inspect
+import itertools
 import os
+import threading
 import time
+import types
 
-from . import logging, template
+from . import aio, backends, formats, formatting, logging, template
+from .checkpoint import Checkpoint
+from .compact import CompactMode
+from .dedup import DedupCache, DedupMode
 from .errors import GeneratorError
 from .inputs import Inputs
+from .schema import compile_schema
 
 
 class Generator:
     """The main generator class."""
 
+    @dataclass
+    class Stats:
+        inputs: Dict[str, Inputs.Stats] = field(default_factory=dict)
+        outputs: Dict[str, "Outputs.Stats"] = field(default_factory=dict)
+        files: Optional[Dict[str, str]] = None
+
+        def written_files(self) -> List[str]:
+            """Paths of all files that were written, i.e. created or changed."""
+
+            return [p for stats in self.outputs.values() for p in stats.written_files]
+
+
     def __init__(
         self,
         section_delim = None,
         save_orphaned_sections = True,
         filters = None,
-        logger = logging.LogFormat.PRETTY
+        logger = logging.LogFormat.PRETTY,
+        template_reload = template.ReloadMode.ALWAYS,
+        keep_fragment_cache = False,
+        formatters = None,
+        format_cache_path = None,
+        keep_input_cache = False,
+        writer_threads = 4,
+        fsync = False,
+        output_backend = None,
+        dedup = DedupMode.OFF,
+        checkpoint_dir = None
     ):
         self.save_orphaned_sections = save_orphaned_sections
+        self.keep_input_cache = keep_input_cache
+        self.writer_threads = writer_threads
+        self.dedup = dedup
+        self._checkpoint = Checkpoint(checkpoint_dir) if checkpoint_dir is not None else None
+
+        if output_backend is None:
+            self.output_backend = backends.DirectoryBackend(fsync)
+        elif fsync:
+            raise GeneratorError("fsync only applies to the default output backend; pass DirectoryBackend(fsync=True) instead")
+        else:
+            self.output_backend = output_backend
+        self._input_file_cache = {}
+        self._input_formats = formats.default_formats.copy()
 
         self._input_decls = {}
         self._transformer_decls = {}
         self._output_decls = {}
 
-        self._template_env = template.make_new_env(section_delim, filters)
+        self._template_env = template.make_new_env(section_delim, filters, template_reload)
+        self._template_env.fragment_cache_keep = keep_fragment_cache
+
+        if formatters is not None:
+            self._post_processor = formatting.PostProcessor(formatters, format_cache_path)
+        else:
+            self._post_processor = None
 
         if isinstance(logger, logging.LogFormat):
             self.log = logging.Logger(logging.LogFormat.PRETTY)
@@ -41,16 +95,54 @@ class Generator:
         self,
         name: str,
         impl: Callable[..., None],
-        args = {}
+        args = {},
+        compact_mode: CompactMode = CompactMode.OFF,
+        streaming: bool = False,
+        schema = None
     ) -> None:
-        """Declare an input group."""
+        """Declare an input group.
+
+        With compact_mode, parsed data is stored with interned strings and tuples
+        instead of lists (see snapi.compact).
+
+        With streaming, impl must be a generator function that yields (path, record)
+        pairs, i.e. from Inputs.records_from_file. Records are then passed on to the
+        transformer as they are read, instead of a dict of all parsed files.
+        Streaming inputs can only be used by a single transformer.
+
+        With schema, each input file is validated against a JSON Schema subset (see
+        snapi.schema) as it is read. Results are cached by file content, so unchanged
+        files are not validated again. All errors of the group are logged, then the
+        run fails."""
+
+        if schema is not None and streaming:
+            raise GeneratorError(f"streaming inputs '{name}' do not support schema validation")
 
         self._input_decls[name] = {
             "impl": impl,
-            "args": args
+            "args": args,
+            "compact_mode": compact_mode,
+            "streaming": streaming,
+            "validator": compile_schema(schema) if schema is not None else None,
+            "schema_cache": {}
         }
 
 
+    def add_input_format(
+        self,
+        suffix: Union[str, Tuple[str, ...]],
+        parser: formats.Parser,
+        name: Optional[str] = None,
+        stream_parser: Optional[formats.StreamParser] = None
+    ) -> None:
+        """Register a parser for input files with the given suffix.
+
+        The parser receives the raw file content as bytes.
+        The optional stream parser receives the open binary file and yields records."""
+
+        self._input_formats.register(suffix, parser, name, stream_parser)
+
+
     def add_transformer(
         self,
         name: str,
@@ -58,15 +150,26 @@ class Generator:
         impl: Callable[..., None],
         args = {}
     ) -> None:
-        """Declare a transformer."""
+        """Declare a transformer.
+
+        For streaming inputs, impl receives an iterator of (path, record) pairs and
+        should be a generator function, so its results can be consumed by the output
+        delegate as they arrive. Such a transformer can only be used by a single
+        output group."""
 
         if inputs not in self._input_decls:
             raise GeneratorError(f"undefined inputs '{inputs}'")
 
+        streaming = self._input_decls[inputs]["streaming"]
+
+        if streaming and any(d["inputs"] == inputs for d in self._transformer_decls.values()):
+            raise GeneratorError(f"streaming inputs '{inputs}' are already used by another transformer")
+
         self._transformer_decls[name] = {
             "inputs": inputs,
             "impl": impl,
-            "args": args
+            "args": args,
+            "streaming": streaming
         }
 
 
@@ -80,6 +183,10 @@ class Generator:
 
         if data not in self._transformer_decls:
             raise GeneratorError(f"undefined transformer '{data}'")
+
+        if self._transformer_decls[data]["streaming"] \
+                and any(d["data"] == data for d in self._output_decls.values()):
+            raise GeneratorError(f"streaming transformer '{data}' is already used by another output group")
         
         self._output_decls[name] = {
             "data": data,
@@ -88,12 +195,176 @@ class Generator:
         }
 
 
-    def run(self) -> None:
-        """Run the generator with the previously declared inputs, transformers and outputs."""
+    def run(self, resume: bool = False) -> "Generator.Stats":
+        """Run the generator with the previously declared inputs, transformers and outputs.
+
+        With keep_input_cache, parsed input files are kept between runs and only
+        re-read if modified. Transformers must not modify their input data in that case.
+
+        With a checkpoint_dir, completed steps are recorded in a journal. If resume is
+        set, input groups, transformer results and output files that were completed by
+        a previous, failed run are skipped if they are still valid."""
+
+        self._check_decls()
+        self._begin_checkpoint(resume)
+
+        try:
+            in_cache = {}
+            tr_cache = {}
+            restored = {}
+            streamed_inputs = {}
+            run_stats = self.Stats()
+
+            self.log.step(f"Inputs")
+
+            for name, decl in self._input_decls.items():
+                with logging.Scope(self.log, name):
+                    if decl["streaming"]:
+                        in_cache[name] = self._stream_in_decl(name, decl, streamed_inputs)
+                        self.log.info(f"streaming")
+                        continue
+
+                    if self._restore_in_decl(name, restored):
+                        in_cache[name] = None
+                        self.log.info(f"restored from checkpoint")
+                        continue
+
+                    in_cache[name], run_stats.inputs[name] = self._process_in_decl(name, decl)
+                    self._log_input_stats(run_stats.inputs[name])
+
+            self.log.step(f"Transformers")
+
+            for name, decl in self._transformer_decls.items():
+                with logging.Scope(self.log, name):
+                    tr_cache[name] = self._process_tr_decl(name, decl, in_cache, restored)
+
+            self.log.step(f"Outputs")
+
+            dedup_cache = self._begin_outputs()
+
+            try:
+                for name, decl in self._output_decls.items():
+                    with logging.Scope(self.log, name):
+                        run_stats.outputs[name] = self._process_out_decl(decl, tr_cache, dedup_cache)
+                        self._log_output_stats(run_stats.outputs[name])
+            except BaseException:
+                self.output_backend.close(commit=False)
+                raise
+
+            self._finish_run(streamed_inputs, run_stats)
+
+            return run_stats
+        finally:
+            self._end_checkpoint()
+
+
+    async def arun(self, executor: Optional[Executor] = None, resume: bool = False) -> "Generator.Stats":
+        """Run the generator without blocking the event loop.
+
+        Delegates may either be regular functions, which are run in the executor,
+        or coroutine functions, which are awaited on the event loop and should use
+        Inputs.afrom_file and Outputs.ato_file to offload blocking work.
+        Declarations of the same step are processed concurrently. Multiple runs of
+        the same generator may execute concurrently and share its template environment.
+        Streaming pipelines only support regular functions as delegates, and archive
+        output backends and checkpoints do not support concurrent runs."""
+
+        self._check_decls()
+        self._begin_checkpoint(resume)
+
+        try:
+            in_cache = {}
+            tr_cache = {}
+            restored = {}
+            streamed_inputs = {}
+            run_stats = self.Stats()
+
+            for decl in self._input_decls.values():
+                if decl["streaming"] and inspect.isasyncgenfunction(decl["impl"]):
+                    raise GeneratorError("streaming inputs do not support async delegates")
+
+            async def process_in_decl(name, decl):
+                with logging.Scope(self.log, name):
+                    if decl["streaming"]:
+                        in_cache[name] = self._stream_in_decl(name, decl, streamed_inputs)
+                        self.log.info(f"streaming")
+                        return
+
+                    if self._restore_in_decl(name, restored):
+                        in_cache[name] = None
+                        self.log.info(f"restored from checkpoint")
+                        return
+
+                    if inspect.iscoroutinefunction(decl["impl"]):
+                        inputs = self._make_inputs(decl, executor)
+                        await decl["impl"](inputs, **decl["args"])
+                        data, stats = self._finish_in_decl(name, decl, inputs)
+                    else:
+                        data, stats = await aio.run_in_executor(executor, self._process_in_decl, name, decl)
+
+                    in_cache[name] = data
+                    run_stats.inputs[name] = stats
+                    self._log_input_stats(stats)
+
+            async def process_tr_decl(name, decl):
+                with logging.Scope(self.log, name):
+                    if inspect.iscoroutinefunction(decl["impl"]):
+                        ok, result = self._restore_tr_decl(name, decl, restored)
+                        if not ok:
+                            result = await decl["impl"](in_cache[decl["inputs"]], **decl["args"])
+                            self._record_tr_decl(name, decl, result)
+                            self.log.info(f"done")
+                        tr_cache[name] = result
+                    else:
+                        tr_cache[name] = await aio.run_in_executor(
+                            executor, self._process_tr_decl, name, decl, in_cache, restored
+                        )
+
+            async def process_out_decl(name, decl):
+                with logging.Scope(self.log, name):
+                    if inspect.iscoroutinefunction(decl["impl"]):
+                        outputs = self._make_outputs(dedup_cache, executor)
+                        try:
+                            await decl["impl"](outputs, tr_cache[decl["data"]], **decl["args"])
+                        except BaseException:
+                            await aio.run_in_executor(executor, outputs._abort)
+                            raise
+                        await aio.run_in_executor(executor, outputs.flush)
+                        stats = outputs._stats
+                    else:
+                        stats = await aio.run_in_executor(
+                            executor, self._process_out_decl, decl, tr_cache, dedup_cache
+                        )
+
+                    run_stats.outputs[name] = stats
+                    self._log_output_stats(stats)
+
+            self.log.step(f"Inputs")
+
+            await _gather_all(process_in_decl(n, d) for n, d in self._input_decls.items())
+
+            self.log.step(f"Transformers")
+
+            await _gather_all(process_tr_decl(n, d) for n, d in self._transformer_decls.items())
+
+            self.log.step(f"Outputs")
+
+            dedup_cache = await aio.run_in_executor(executor, self._begin_outputs)
+
+            try:
+                await _gather_all(process_out_decl(n, d) for n, d in self._output_decls.items())
+            except BaseException:
+                await aio.run_in_executor(executor, self.output_backend.close, False)
+                raise
 
-        in_cache = {}
-        tr_cache = {}
+            await aio.run_in_executor(executor, self._finish_run, streamed_inputs, run_stats)
 
+            return run_stats
+        finally:
+            self._end_checkpoint()
+
+
+    def _check_decls(self) -> None:
         if len(self._input_decls) == 0:
             raise GeneratorError("no inputs declared")
 
@@ -103,57 +374,229 @@ class Generator:
         if len(self._output_decls) == 0:
             raise GeneratorError("no outputs declared")
 
-        def process_in_decl(decl):
-            
-            impl = decl["impl"]
-            args = decl["args"]
 
-            inputs = Inputs(self.log)
-            impl(inputs, **args)
-            return inputs._data, inputs._stats
-        
-        self.log.step(f"Inputs")
+    def _make_inputs(self, decl, executor: Optional[Executor] = None) -> Inputs:
+        file_cache = self._input_file_cache if self.keep_input_cache and not decl["streaming"] else None
 
-        for name, decl in self._input_decls.items():
-            if not name in in_cache:
-                with logging.Scope(self.log, name):
-                    in_cache[name], stats = process_in_decl(decl)
-                    self.log.info(f"{stats.read_file_count} files read")
+        return Inputs(
+            self.log,
+            decl["compact_mode"],
+            file_cache,
+            self._input_formats,
+            executor,
+            decl["validator"],
+            decl["schema_cache"]
+        )
 
-        def process_tr_decl(decl):
-            impl = decl["impl"]
-            args = decl["args"]
-            
-            data = in_cache[decl["inputs"]]
-            return impl(data, **args)
 
-        self.log.step(f"Transformers")
+    def _process_in_decl(self, name, decl):
+        inputs = self._make_inputs(decl)
+        decl["impl"](inputs, **decl["args"])
+        return self._finish_in_decl(name, decl, inputs)
+
+
+    def _finish_in_decl(self, name, decl, inputs: Inputs):
+        if decl["validator"] is not None:
+            # Only keep results for documents that are still in use.
+            decl["schema_cache"] = {d: inputs._schema_cache[d] for d in inputs._schema_digests}
+            self._check_schema_errors(inputs._schema_errors)
+
+        if self._checkpoint is not None:
+            decl_key = _decl_key(decl)
+            if decl_key is not None:
+                self._checkpoint.record_input(name, decl_key, inputs._files)
+
+        return inputs._data, inputs._stats
+
+
+    def _check_schema_errors(self, schema_errors: Dict[str, List[str]]) -> None:
+        if len(schema_errors) == 0:
+            return
+
+        error_count = 0
+        for path in sorted(schema_errors):
+            for e in schema_errors[path]:
+                self.log.error(f"{path}: {e}")
+                error_count += 1
+
+        raise GeneratorError(f"schema validation failed with {error_count} errors in {len(schema_errors)} files")
+
+
+    def _restore_in_decl(self, name, restored) -> bool:
+        """Restore the results of all transformers using the input group from the checkpoint."""
+
+        if self._checkpoint is None:
+            return False
+
+        users = [(n, d) for n, d in self._transformer_decls.items() if d["inputs"] == name]
+        if len(users) == 0:
+            return False
+
+        results = {}
+        for tr_name, tr_decl in users:
+            ok, results[tr_name] = self._load_tr_checkpoint(tr_name, tr_decl)
+            if not ok:
+                return False
+
+        restored.update(results)
+        return True
+
+
+    def _stream_in_decl(self, name, decl, streamed_inputs):
+        inputs = self._make_inputs(decl)
+        streamed_inputs[name] = inputs
+        yield from decl["impl"](inputs, **decl["args"])
+
+
+    def _process_tr_decl(self, name, decl, in_cache, restored):
+        ok, result = self._restore_tr_decl(name, decl, restored)
+        if ok:
+            return result
+
+        data = in_cache[decl["inputs"]]
+        result = decl["impl"](data, **decl["args"])
+
+        self._record_tr_decl(name, decl, result)
+        self.log.info(f"streaming" if decl["streaming"] else f"done")
+        return result
+
+
+    def _restore_tr_decl(self, name, decl, restored):
+        if name in restored:
+            ok, result = True, restored[name]
+        else:
+            ok, result = self._load_tr_checkpoint(name, decl)
+
+        if ok:
+            self.log.info(f"restored from checkpoint")
+        return ok, result
+
+
+    def _load_tr_checkpoint(self, name, decl):
+        if self._checkpoint is None or decl["streaming"]:
+            return False, None
+
+        inputs = decl["inputs"]
+        decl_key = _decl_key(decl)
+        inputs_decl_key = _decl_key(self._input_decls[inputs])
+        if decl_key is None or inputs_decl_key is None:
+            return False, None
+
+        return self._checkpoint.load_transformer(name, decl_key, inputs, inputs_decl_key)
+
+
+    def _record_tr_decl(self, name, decl, result) -> None:
+        if self._checkpoint is None or decl["streaming"]:
+            return
+
+        decl_key = _decl_key(decl)
+        if decl_key is not None:
+            self._checkpoint.record_transformer(name, decl_key, decl["inputs"], result)
+
+
+    def _make_outputs(self, dedup_cache: Optional[DedupCache], executor: Optional[Executor] = None) -> "Outputs":
+        return Outputs(
+            log=self.log,
+            env=self._template_env,
+            with_save_orphans=self.save_orphaned_sections,
+            post_processor=self._post_processor,
+            executor=executor,
+            writer_threads=self.writer_threads,
+            backend=self.output_backend,
+            dedup_cache=dedup_cache,
+            checkpoint=self._checkpoint
+        )
+
+
+    def _process_out_decl(self, decl, tr_cache, dedup_cache):
+        outputs = self._make_outputs(dedup_cache)
+
+        try:
+            decl["impl"](outputs, tr_cache[decl["data"]], **decl["args"])
+        except BaseException:
+            outputs._abort()
+            raise
+
+        outputs.flush()
+        return outputs._stats
+
+
+    def _begin_checkpoint(self, resume: bool) -> None:
+        if self._checkpoint is not None:
+            self._checkpoint.begin(resume)
+        elif resume:
+            raise GeneratorError("resume requires a checkpoint_dir")
 
-        for name, decl in self._transformer_decls.items():
-            if not name in tr_cache:
-                with logging.Scope(self.log, name):
-                    tr_cache[name] = process_tr_decl(decl)
-                    self.log.info(f"done")
-
-        def process_out_decl(decl):
-            impl = decl["impl"]
-            args = decl["args"]
-            data = tr_cache[decl["data"]]
-
-            outputs = Outputs(
-                log=self.log,
-                env=self._template_env,
-                with_save_orphans=self.save_orphaned_sections
-            )
-            impl(outputs, data, **args)
-            return outputs._stats
 
-        self.log.step(f"Outputs")
+    def _end_checkpoint(self) -> None:
+        if self._checkpoint is not None:
+            self._checkpoint.end()
 
-        for name, decl in self._output_decls.items():
+
+    def _begin_outputs(self) -> Optional[DedupCache]:
+        """Prepare the output phase and return the dedup cache of the run, if enabled.
+
+        The cache is created per run and passed to the Outputs, so that it is not shared
+        with other runs of the same generator."""
+
+        template.begin_run(self._template_env)
+        self.output_backend.open()
+
+        if self.dedup != DedupMode.OFF:
+            return DedupCache(self.dedup)
+        return None
+
+
+    def _finish_run(self, streamed_inputs, run_stats: "Generator.Stats") -> None:
+        for name, inputs in streamed_inputs.items():
             with logging.Scope(self.log, name):
-                stats = process_out_decl(decl)
-                self.log.info(f"{stats.written_file_count} files written")
+                stats = inputs._stats
+                run_stats.inputs[name] = stats
+                self.log.info(f"{stats.read_file_count} files read, {stats.record_count} records streamed")
+
+        self.output_backend.close()
+        run_stats.files = self.output_backend.files()
+
+        if self._post_processor is not None:
+            self._post_processor.save_cache()
+
+        if self._checkpoint is not None:
+            self._checkpoint.clear()
+
+
+    def _log_input_stats(self, stats: Inputs.Stats) -> None:
+        if stats.cached_file_count > 0:
+            self.log.info(f"{stats.read_file_count} files read, {stats.cached_file_count} cached")
+        else:
+            self.log.info(f"{stats.read_file_count} files read")
+
+        if stats.validated_file_count > 0:
+            self.log.info(f"{stats.validated_file_count} files validated")
+
+
+    def _log_output_stats(self, stats: "Outputs.Stats") -> None:
+        self.log.info(f"{stats.written_file_count} files written, {stats.unchanged_file_count} unchanged")
+
+        if stats.resumed_file_count > 0:
+            self.log.info(f"{stats.resumed_file_count} files restored from checkpoint")
+
+        if stats.formatted_file_count > 0:
+            self.log.info(
+                f"{stats.formatted_file_count} files formatted, "
+                f"{stats.format_cache_hits} from cache"
+            )
+
+        if stats.dedup_render_count + stats.dedup_file_count > 0:
+            self.log.info(
+                f"deduplicated: {stats.dedup_render_count} renders, "
+                f"{stats.dedup_file_count} files"
+            )
+
+        if stats.fragment_cache_hits + stats.fragment_cache_misses > 0:
+            self.log.info(
+                f"fragment cache: {stats.fragment_cache_hits} hits, "
+                f"{stats.fragment_cache_misses} misses"
+            )
 
 
 class Outputs:
@@ -162,49 +605,318 @@ class Outputs:
     @dataclass
     class Stats:
         written_file_count: int = 0
+        unchanged_file_count: int = 0
+        formatted_file_count: int = 0
+        format_cache_hits: int = 0
+        format_error_count: int = 0
+        fragment_cache_hits: int = 0
+        fragment_cache_misses: int = 0
+        resumed_file_count: int = 0
+        dedup_render_count: int = 0
+        dedup_file_count: int = 0
+        written_files: List[str] = field(default_factory=list)
+
+
+    FORMAT_BATCH_SIZE = 256
+    FILES_CHUNK_SIZE = 256
+    MAX_PENDING_WRITES = 1024
 
 
-    def __init__(self, log: logging.ILogger, with_save_orphans: bool, env):
+    def __init__(
+        self,
+        log: logging.ILogger,
+        with_save_orphans: bool,
+        env,
+        post_processor: formatting.PostProcessor = None,
+        executor: Optional[Executor] = None,
+        writer_threads: int = 4,
+        backend: Optional[backends.OutputBackend] = None,
+        dedup_cache: Optional[DedupCache] = None,
+        checkpoint: Optional[Checkpoint] = None
+    ):
         self.log = log
         self._with_save_orphans = with_save_orphans
         self._env = env
+        self._post_processor = post_processor
+        self._executor = executor
+        self._async_lock = None
+        self._pending_formats = []
+        self._writer_threads = writer_threads
+        self._backend = backend if backend is not None else backends.DirectoryBackend()
+        self._writer = None
+        self._pending_writes = deque()
+        self._created_dirs = set()
+        self._dedup = dedup_cache
+        self._unlinkable_paths = set()
+        self._checkpoint = checkpoint
+        self._checkpoint_keys = {}
+        self._stats_lock = threading.Lock()
         self._stats = self.Stats()
 
 
     def to_file(self, path: str, template: str, data: Any) -> None:
         """Generate output file from template with substituted data."""
 
+        state = self._env.render_state
+        hits = state.fragment_cache_hits
+        misses = state.fragment_cache_misses
+
         self._write_output_file(
             template_path=template,
             output_path=path,
             data=data
         )
-        self._stats.written_file_count += 1
+        self._stats.fragment_cache_hits += state.fragment_cache_hits - hits
+        self._stats.fragment_cache_misses += state.fragment_cache_misses - misses
+
+
+    def to_files(self, items: Iterable[Tuple[str, str, Any]]) -> None:
+        """Generate multiple output files from (path, template, data) items.
+
+        Output directories are created once up front, and rendered content is written
+        by a pool of background threads while rendering continues. This also applies
+        to subsequent to_file calls. Writes are complete after flush(), which is called
+        automatically at the end of the output group. At most MAX_PENDING_WRITES writes
+        are pending at a time, and a failed write is raised by a later call.
+
+        Items are consumed in chunks, so they may be produced lazily, i.e. from a
+        streaming transformer."""
+
+        if self._writer is None and self._writer_threads > 0:
+            self._writer = ThreadPoolExecutor(max_workers=self._writer_threads)
+
+        it = iter(items)
+        while True:
+            chunk = list(itertools.islice(it, self.FILES_CHUNK_SIZE))
+            if len(chunk) == 0:
+                break
+
+            for d in set(os.path.dirname(path) for path, _, _ in chunk):
+                self._ensure_dir(d)
+
+            for path, template_path, data in chunk:
+                self.to_file(path, template_path, data)
+
+
+    def flush(self) -> None:
+        """Format pending outputs and wait for background writes to complete.
+
+        Raises the first error that occurred in a background write."""
+
+        try:
+            self._flush_formats()
+        finally:
+            writes = self._shutdown_writer()
+
+        for w in writes:
+            w.result()
+
+
+    def _abort(self) -> None:
+        """Drop pending formats and wait for background writes after the output delegate failed."""
+
+        self._pending_formats = []
+
+        for w in self._shutdown_writer():
+            e = w.exception()
+            if e is not None:
+                self.log.error(f"background write failed: {e}")
+
+
+    def _shutdown_writer(self) -> List[Future]:
+        if self._writer is None:
+            return []
+
+        writes = list(self._pending_writes)
+        self._pending_writes.clear()
+
+        self._writer.shutdown(wait=True)
+        self._writer = None
+
+        return writes
+
+
+    async def ato_file(self, path: str, template: str, data: Any) -> None:
+        """Generate output file from template with substituted data without blocking the event loop.
+
+        Rendering and writing run in the executor. Calls on the same Outputs are serialized."""
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            await aio.run_in_executor(self._executor, self.to_file, path, template, data)
 
 
     def _write_output_file(self, template_path: str, output_path: str, data: Any) -> None:
-        self._env.section_output_path = output_path
-        self._env.section_data = None
+        if self._checkpoint is not None:
+            key = self._checkpoint.output_key(template_path, data)
+            if key is not None:
+                self._checkpoint_keys[output_path] = key
+
+                s = self._backend.read(output_path)
+                if s is not None and self._checkpoint.is_output_done(output_path, key, s):
+                    self._stats.resumed_file_count += 1
+                    self._write_content(output_path, s)
+                    return
+
+        state = self._env.render_state
+        state.output_path = output_path
+        state.backend = self._backend
+        state.section_data = None
+
+        render_key = None
+        s = None
+
+        if self._dedup is not None:
+            render_key = self._dedup.render_key(template_path, data)
+            if render_key is not None:
+                s = self._dedup.get_render(render_key)
+
+        if s is not None:
+            self._stats.dedup_render_count += 1
+        else:
+            tpl = self._env.get_template(template_path)
+            s = tpl.render(data)
 
-        tpl = self._env.get_template(template_path)
-        s = tpl.render(data)
+            # Content with sections depends on the existing file, so it is never shared.
+            if state.section_data is not None:
+                self._unlinkable_paths.add(output_path)
+            elif render_key is not None:
+                self._dedup.add_render(render_key, s)
 
         if self._with_save_orphans:
             self._save_orphaned_sections(output_path)
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        command = None
+        if self._post_processor is not None:
+            command = self._post_processor.select(output_path)
+
+        if command is None:
+            self._write_content(output_path, s)
+            return
+
+        self._pending_formats.append((output_path, s, command))
+
+        if len(self._pending_formats) >= self.FORMAT_BATCH_SIZE:
+            self._flush_formats()
+
+
+    def _flush_formats(self) -> None:
+        if len(self._pending_formats) == 0:
+            return
+
+        items = self._pending_formats
+        self._pending_formats = []
+
+        contents, cache_hits = self._post_processor.format_batch(items, self.log)
+
+        error_count = 0
+        for (output_path, _, _), s in zip(items, contents):
+            if s is None:
+                error_count += 1
+            else:
+                self._write_content(output_path, s)
+
+        self._stats.formatted_file_count += len(items) - error_count
+        self._stats.format_cache_hits += cache_hits
+        self._stats.format_error_count += error_count
+
+        if error_count > 0:
+            raise GeneratorError(f"formatting failed for {error_count} files")
+
+
+    def _write_content(self, output_path: str, s: str) -> None:
+        self._ensure_dir(os.path.dirname(output_path))
+
+        if self._dedup is not None and self._dedup.links and output_path not in self._unlinkable_paths:
+            canonical_path, canonical_written = self._dedup.claim_content(output_path, s)
+
+            if canonical_path == output_path:
+                task = functools.partial(self._write_canonical_file, output_path, s, canonical_written)
+            else:
+                task = functools.partial(self._link_file, canonical_path, canonical_written, output_path, s)
+        else:
+            task = functools.partial(self._write_file, output_path, s)
+
+        if self._writer is not None:
+            self._pending_writes.append(self._writer.submit(task))
+            self._drain_writes()
+        else:
+            task()
+
+
+    def _drain_writes(self) -> None:
+        # Collect finished writes, and wait for the oldest ones while too many are pending,
+        # so that rendered contents do not pile up and write errors are raised early.
+        pending = self._pending_writes
+        while pending and (pending[0].done() or len(pending) > self.MAX_PENDING_WRITES):
+            pending.popleft().result()
+
+
+    def _write_file(self, output_path: str, s: str) -> None:
+        changed = self._backend.update(output_path, s)
+
+        with self._stats_lock:
+            if changed:
+                self._stats.written_file_count += 1
+                self._stats.written_files.append(output_path)
+            else:
+                self._stats.unchanged_file_count += 1
+
+        self._record_output(output_path, s)
 
-        with open(output_path, 'w') as f:
-            f.write(s)
+
+    def _write_canonical_file(self, output_path: str, s: str, written: Future) -> None:
+        try:
+            self._write_file(output_path, s)
+        except BaseException as e:
+            if not written.done():
+                written.set_exception(e)
+            raise
+
+        if not written.done():
+            written.set_result(None)
+
+
+    def _link_file(self, canonical_path: str, canonical_written: Future, output_path: str, s: str) -> None:
+        canonical_written.result()
+
+        symbolic = self._dedup.mode == DedupMode.SYMLINK
+        changed = self._backend.link(canonical_path, output_path, s, symbolic)
+
+        with self._stats_lock:
+            self._stats.dedup_file_count += 1
+            if changed:
+                self._stats.written_file_count += 1
+                self._stats.written_files.append(output_path)
+            else:
+                self._stats.unchanged_file_count += 1
+
+        self._record_output(output_path, s)
+
+
+    def _record_output(self, output_path: str, s: str) -> None:
+        if self._checkpoint is not None:
+            key = self._checkpoint_keys.get(output_path)
+            if key is not None:
+                self._checkpoint.record_output(output_path, key, s)
+
+
+    def _ensure_dir(self, path: str) -> None:
+        if path and path not in self._created_dirs:
+            self._backend.make_dirs(path)
+            self._created_dirs.add(path)
 
 
     def _save_orphaned_sections(self, output_path: str) -> None:
-        if self._env.section_data is None:
+        section_data = self._env.render_state.section_data
+        if section_data is None:
             return
         
         orphan_count = 0
 
-        for name, data in self._env.section_data.items():
+        for name, data in section_data.items():
             if not data.referenced:
                 orphan_count += 1
 
@@ -214,11 +926,59 @@ class Outputs:
         cur_time = int(time.time()) 
         fn = f"{output_path}.{cur_time}.orphaned"
 
-        with open(fn, 'w') as f:
-            for name, data in self._env.section_data.items():
-                if not data.referenced:
-                    f.write(f"BEGIN SECTION {name}\n")
-                    f.write(data.content)
-                    f.write(f"END SECTION {name}\n\n")
+        buf = ""
+        for name, data in section_data.items():
+            if not data.referenced:
+                buf += f"BEGIN SECTION {name}\n"
+                buf += data.content
+                buf += f"END SECTION {name}\n\n"
+
+        self._backend.write(fn, buf)
 
         self.log.warn(f"Saved orphaned sections from '{output_path}' to '{fn}'")
+
+
+def _decl_key(decl) -> Optional[str]:
+    """Return the checkpoint key of a declaration, or None if its delegate cannot be identified.
+
+    The key includes a digest of the delegate's code, so that results of a delegate
+    that was changed since the failed run are not reused. Delegates without a
+    qualified name, i.e. functools.partial objects, are not checkpointed."""
+
+    impl = decl["impl"]
+    qualname = getattr(impl, "__qualname__", None)
+    if qualname is None:
+        return None
+
+    code = getattr(impl, "__code__", None)
+    code_digest = _code_digest(code) if code is not None else ""
+
+    return f"{impl.__module__}.{qualname}@{code_digest}:{decl['args']!r}:{decl.get('compact_mode')}"
+
+
+def _code_digest(code: types.CodeType) -> str:
+    h = hashlib.sha256()
+
+    def update(code):
+        h.update(code.co_code)
+        h.update(repr(code.co_names).encode())
+        for c in code.co_consts:
+            if isinstance(c, types.CodeType):
+                update(c)
+            else:
+                h.update(repr(c).encode())
+
+    update(code)
+    return h.hexdigest()[:16]
+
+
+async def _gather_all(aws) -> None:
+    """Wait until all declarations of a step have settled, then raise the first error.
+
+    Unlike plain gather, this never returns while other declarations are still
+    running in the executor, i.e. writing to the output backend."""
+
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
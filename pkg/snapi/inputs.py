@@ -1,15 +1,18 @@
 """The main generator class and supporting definitions."""
 
-from typing import Any, Union, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, Tuple
 
-from dataclasses import dataclass
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
 
+import asyncio
+import hashlib
 import os
-import json
+import time
 
-import yaml
-
-from . import logging
+from . import aio, discovery, formats, logging
+from .compact import CompactMode, compact
+from .schema import Validator
 
 
 class Inputs:
@@ -18,30 +21,149 @@ class Inputs:
     @dataclass
     class Stats:
         read_file_count: int = 0
-
-
-    def __init__(self, log: logging.ILogger):
+        cached_file_count: int = 0
+        record_count: int = 0
+        validated_file_count: int = 0
+        parse_time: Dict[str, float] = field(default_factory=dict)
+
+
+    def __init__(
+        self,
+        log: logging.ILogger,
+        compact_mode: CompactMode = CompactMode.OFF,
+        file_cache: Optional[Dict[str, Any]] = None,
+        input_formats: formats.FormatRegistry = formats.default_formats,
+        executor: Optional[Executor] = None,
+        validator: Optional[Validator] = None,
+        schema_cache: Optional[Dict[bytes, List[str]]] = None
+    ):
         self.log = log
+        self._compact_mode = compact_mode
+        self._file_cache = file_cache
+        self._formats = input_formats
+        self._executor = executor
+        self._async_lock = None
         self._data = {}
+        self._files = []
+        self._validator = validator
+        self._schema_cache = schema_cache if schema_cache is not None else {}
+        self._schema_digests = set()
+        self._schema_errors = {}
         self._stats = self.Stats()
 
 
     def from_file(self, path: str) -> None:
         """Read input data from file."""
 
-        self._data[path] = self._read_input_file(path)
+        self._files.append(path)
+
+        if self._file_cache is None:
+            data, digest = self._read_input_file(path)
+            self._data[path] = compact(data, self._compact_mode)
+            self._stats.read_file_count += 1
+            self._validate(path, self._data[path], digest)
+            return
+
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size, self._compact_mode)
+
+        entry = self._file_cache.get(path)
+        if entry is not None and entry[0] == key:
+            self._data[path] = entry[1]
+            self._stats.cached_file_count += 1
+            self._validate(path, entry[1], entry[2])
+            return
+
+        data, digest = self._read_input_file(path)
+        data = compact(data, self._compact_mode)
+        self._file_cache[path] = (key, data, digest)
+        self._data[path] = data
+        self._stats.read_file_count += 1
+        self._validate(path, data, digest)
+
+
+    async def afrom_file(self, path: str) -> None:
+        """Read input data from file without blocking the event loop.
+
+        Reading and parsing run in the executor. Calls on the same Inputs are serialized."""
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            await aio.run_in_executor(self._executor, self.from_file, path)
+
+
+    def records_from_file(self, path: str) -> Iterator[Tuple[str, Any]]:
+        """Read input records from file one at a time.
+
+        Yields (path, record) pairs, i.e. one per document of a multi-document YAML file
+        or per line of a JSON Lines file. Intended for streaming input delegates."""
+
+        fmt = self._formats.lookup_stream(path)
+        if fmt is None:
+            self.log.warn(f"No input format registered for '{path}'")
+            return
+
+        name, stream_parser = fmt
+        self._files.append(path)
         self._stats.read_file_count += 1
 
+        with open(path, 'rb') as f:
+            records = iter(stream_parser(f))
+
+            while True:
+                t = time.perf_counter()
+                try:
+                    record = next(records)
+                except StopIteration:
+                    break
+                finally:
+                    self._add_parse_time(name, time.perf_counter() - t)
+
+                self._stats.record_count += 1
+                yield path, compact(record, self._compact_mode)
+
+
+    def _read_input_file(self, path: str) -> Tuple[Any, Optional[bytes]]:
+        """Return the parsed data and a digest of the file content."""
+
+        fmt = self._formats.lookup(path)
+        if fmt is None:
+            self.log.warn(f"No input format registered for '{path}'")
+            return None, None
+
+        name, parser = fmt
 
-    def _read_input_file(self, path: str) -> Any:
-        if path.endswith(".json"):
-            with open(path, 'r') as f:
-                return json.load(f)
-        elif path.endswith((".yaml", ".yml")):
-            with open(path, 'r') as f:
-                return yaml.safe_load(f)
-        else:
-            return None
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        t = time.perf_counter()
+        data = parser(content)
+        self._add_parse_time(name, time.perf_counter() - t)
+
+        return data, hashlib.blake2b(content, digest_size=16).digest()
+
+
+    def _validate(self, path: str, data: Any, digest: Optional[bytes]) -> None:
+        """Validate a document, reusing the result for unchanged content."""
+
+        if self._validator is None or digest is None:
+            return
+
+        errors = self._schema_cache.get(digest)
+        if errors is None:
+            errors = self._validator(data)
+            self._schema_cache[digest] = errors
+            self._stats.validated_file_count += 1
+
+        self._schema_digests.add(digest)
+        if errors:
+            self._schema_errors[path] = errors
+
+
+    def _add_parse_time(self, name: str, t: float) -> None:
+        self._stats.parse_time[name] = self._stats.parse_time.get(name, 0.0) + t
 
 
 def from_single_file(inputs: Inputs, file_path: str) -> None:
@@ -65,14 +187,47 @@ def from_directory(
     inputs: Inputs,
     dir_path: str,
     recursive: bool = True,
-    suffix: Union[str,Tuple[str, ...]] = (".yml", ".json")
+    suffix: Union[str, Tuple[str, ...], None] = None,
+    include: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+    snapshot_path: Optional[str] = None
 ) -> None:
-    """Iterate all files in directory and use them as inputs."""
-
-    for root, dirs, files in os.walk(dir_path):
-        for p in files:
-            if p.endswith(suffix):
-                inputs.from_file(os.path.join(root, p))
-        
-        if not recursive:
-            break
+    """Iterate all files in directory and use them as inputs.
+
+    Files are selected by include and exclude glob patterns (see snapi.discovery).
+    By default, all files with a registered input format suffix are included."""
+
+    for p in _find_input_files(inputs, dir_path, recursive, suffix, include, exclude, snapshot_path):
+        inputs.from_file(p)
+
+
+def stream_from_single_file(inputs: Inputs, file_path: str) -> Iterator[Tuple[str, Any]]:
+    """Stream records from a single file."""
+
+    yield from inputs.records_from_file(file_path)
+
+
+def stream_from_directory(
+    inputs: Inputs,
+    dir_path: str,
+    recursive: bool = True,
+    suffix: Union[str, Tuple[str, ...], None] = None,
+    include: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+    snapshot_path: Optional[str] = None
+) -> Iterator[Tuple[str, Any]]:
+    """Iterate all files in directory and stream their records."""
+
+    for p in _find_input_files(inputs, dir_path, recursive, suffix, include, exclude, snapshot_path):
+        yield from inputs.records_from_file(p)
+
+
+def _find_input_files(inputs: Inputs, dir_path, recursive, suffix, include, exclude, snapshot_path) -> List[str]:
+    if include is None:
+        if suffix is None:
+            suffix = inputs._formats.suffixes()
+        elif isinstance(suffix, str):
+            suffix = (suffix,)
+        include = [f"*{s}" for s in suffix]
+
+    return discovery.find_files(dir_path, include, exclude, recursive, snapshot_path)
@@ -1,11 +1,14 @@
 """Logging utilities for use in internal and user-provided functions."""
 
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from enum import Enum
 
 import rich
 import json
 
+from rich.markup import escape
+
 
 class ILogger(ABC):
     """Logging interface."""
@@ -49,7 +52,18 @@ class Logger(ILogger):
         else:
             self._formatter = PrettyFormatter(self)
 
-        self._cur_scope = ""
+        # Context-local, so concurrent async runs do not mix up their scopes.
+        self._scope_var = ContextVar(f"snapi_log_scope_{id(self)}", default="")
+
+
+    @property
+    def _cur_scope(self) -> str:
+        return self._scope_var.get()
+
+
+    @_cur_scope.setter
+    def _cur_scope(self, scope: str) -> None:
+        self._scope_var.set(scope)
 
 
     def step(self, s: str) -> None:
@@ -97,19 +111,19 @@ class PrettyFormatter():
 
 
     def step(self, s: str) -> None:
-        rich.print(f"\n{s} ...")
+        rich.print(f"\n{escape(s)} ...")
 
 
     def info(self, s: str) -> None:
-        rich.print(f"{self._fmt_context(s, 'bold')}{s}")
+        rich.print(f"{self._fmt_context(s, 'bold')}{escape(s)}")
     
     
     def warn(self, s: str) -> None:
-        rich.print(f"{self._fmt_context(s, 'bold yellow')}{s}")
+        rich.print(f"{self._fmt_context(s, 'bold yellow')}{escape(s)}")
         
 
     def error(self, s: str) -> None:
-        rich.print(f"{self._fmt_context(s, 'bold red')}{s}")
+        rich.print(f"{self._fmt_context(s, 'bold red')}{escape(s)}")
 
 
     def _fmt_context(self, s: str, style: str) -> str:
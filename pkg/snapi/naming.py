@@ -2,11 +2,22 @@
 
 from typing import Any, Union, List, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 
 import re
 
 from .errors import GeneratorError
 
+
+CASE_CACHE_SIZE = 1 << 16
+
+# Words of an identifier: acronyms before a capitalized word (HTTP|Server),
+# capitalized or lowercase words with trailing digits (Foo2|Bar), and trailing acronyms (ID).
+# Only applies to ASCII identifiers, others are split by _split_unicode_words.
+_WORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]*[a-z0-9]+|[A-Z]+")
+
+_ALNUM_RE = re.compile(r"[^\W_]+")
+
 @dataclass
 class NestedType:
     """A type with nested inner types, i.e. Dict[str,str]."""
@@ -53,6 +64,96 @@ def convert_type(s: str, mapper, delims: Tuple[str,str]) -> str:
     return _convert_type_impl(parse_type(s), mapper, delims)
 
 
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def split_words(s: str) -> Tuple[str, ...]:
+    """Split an identifier in any common case into its words.
+
+    Example: HTTPServer_v2 -> ("HTTP", "Server", "v2")"""
+
+    if s.isascii():
+        return tuple(_WORD_RE.findall(s))
+    return _split_unicode_words(s)
+
+
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def snake_case(s: str) -> str:
+    """Example: listDir -> list_dir"""
+
+    return "_".join(w.lower() for w in split_words(s))
+
+
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def screaming_case(s: str) -> str:
+    """Example: listDir -> LIST_DIR"""
+
+    return "_".join(w.upper() for w in split_words(s))
+
+
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def kebab_case(s: str) -> str:
+    """Example: listDir -> list-dir"""
+
+    return "-".join(w.lower() for w in split_words(s))
+
+
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def pascal_case(s: str) -> str:
+    """Example: list_dir -> ListDir"""
+
+    return "".join(w.capitalize() for w in split_words(s))
+
+
+@lru_cache(maxsize=CASE_CACHE_SIZE)
+def camel_case(s: str) -> str:
+    """Example: list_dir -> listDir"""
+
+    words = split_words(s)
+    if not words:
+        return ""
+    return words[0].lower() + "".join(w.capitalize() for w in words[1:])
+
+
+case_filters = {
+    "snake_case": snake_case,
+    "screaming_case": screaming_case,
+    "kebab_case": kebab_case,
+    "pascal_case": pascal_case,
+    "camel_case": camel_case
+}
+
+
+def _split_unicode_words(s: str) -> Tuple[str, ...]:
+    # Same rules as _WORD_RE, with str.isupper and str.isalpha instead of ASCII ranges.
+    words = []
+
+    for run in _ALNUM_RE.findall(s):
+        i = 0
+        n = len(run)
+
+        while i < n:
+            j = i
+            while j < n and run[j].isupper():
+                j += 1
+
+            if j == n:
+                words.append(run[i:])
+                break
+
+            if j - i > 1 and run[j].isalpha():
+                # Acronym before a capitalized word.
+                words.append(run[i:j - 1])
+                i = j - 1
+                continue
+
+            k = j
+            while k < n and not run[k].isupper():
+                k += 1
+            words.append(run[i:k])
+            i = k
+
+    return tuple(words)
+
+
 def _parse_type_expr(scanner: _TypeTokenScanner):
     name = scanner.cur
 
@@ -79,6 +180,7 @@ def _parse_type_expr(scanner: _TypeTokenScanner):
 def _tokenize_type_decl(s: str):
     while True:
         separators = ["<", ">", ","]
+        s = s.lstrip()
         tok = _parse_next_token(s, separators)
         yield tok
         s = s[len(tok):]
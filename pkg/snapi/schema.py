@@ -0,0 +1,377 @@
+"""Validation of input documents against a schema.
+
+Schemas use a subset of JSON Schema:
+
+    type: object
+    required: [services]
+    properties:
+      services:
+        type: array
+        items:
+          type: object
+          required: [name]
+          properties:
+            name: {type: string, pattern: "^[a-z_]+$"}
+
+Supported keywords are type, enum, const, properties, required, additionalProperties,
+minProperties, maxProperties, items, minItems, maxItems, minLength, maxLength, pattern,
+minimum, maximum, anyOf, allOf, and $ref to entries of $defs or definitions.
+Annotations like title and description are ignored, other keywords are rejected, as
+are keywords that do not apply to the declared type, i.e. minItems on an object.
+
+A schema is compiled once into nested closures, and validation collects all errors
+of a document instead of stopping at the first one."""
+
+from typing import Any, Callable, List, Mapping as MappingType, Optional, Union
+from collections.abc import Mapping
+
+import re
+
+from .errors import GeneratorError
+
+
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPES = {
+    "object": lambda v: isinstance(v, Mapping),
+    "array": lambda v: isinstance(v, (list, tuple)),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None
+}
+
+_KEYWORDS = {
+    "type", "enum", "const", "properties", "required", "additionalProperties", "minProperties",
+    "maxProperties", "items", "minItems", "maxItems", "minLength", "maxLength", "pattern",
+    "minimum", "maximum", "anyOf", "allOf", "$ref", "$defs", "definitions"
+}
+
+# Types that type-specific keywords apply to.
+_KEYWORD_TYPES = {
+    "properties": ("object",),
+    "required": ("object",),
+    "additionalProperties": ("object",),
+    "minProperties": ("object",),
+    "maxProperties": ("object",),
+    "items": ("array",),
+    "minItems": ("array",),
+    "maxItems": ("array",),
+    "minLength": ("string",),
+    "maxLength": ("string",),
+    "pattern": ("string",),
+    "minimum": ("integer", "number"),
+    "maximum": ("integer", "number")
+}
+
+_ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+
+
+class Validator:
+    """Compiled schema. Calling it returns the list of errors for a document."""
+
+    def __init__(self, schema: MappingType[str, Any]):
+        self.schema = schema
+
+        self._defs = {}
+        self._compiled_defs = {}
+        for key in ("definitions", "$defs"):
+            for name, s in (schema.get(key) or {}).items():
+                self._defs[f"#/{key}/{name}"] = s
+
+        self._check = self._compile(schema, "#")
+
+
+    def __call__(self, data: Any) -> List[str]:
+        errors = []
+        if self._check is not None:
+            self._check(data, "", errors)
+        return errors
+
+
+    def _compile(self, schema: Union[bool, MappingType[str, Any]], where: str) -> Optional[Check]:
+        if schema is True:
+            return None
+        if schema is False:
+            return lambda v, path, errors: errors.append(f"{_fmt_path(path)}: not allowed")
+
+        if not isinstance(schema, Mapping):
+            raise GeneratorError(f"invalid schema at '{where}'")
+
+        unknown = set(schema) - _KEYWORDS - _ANNOTATIONS
+        if unknown:
+            raise GeneratorError(f"unsupported schema keywords at '{where}': {', '.join(sorted(unknown))}")
+
+        checks = []
+
+        if "$ref" in schema:
+            checks.append(self._compile_ref(schema["$ref"], where))
+
+        type_check = None
+        if "type" in schema:
+            type_check = _compile_type(schema["type"], where)
+            _check_keyword_types(schema, where)
+
+        if "enum" in schema:
+            values = list(schema["enum"])
+
+            def check_enum(v, path, errors):
+                if v not in values:
+                    errors.append(f"{_fmt_path(path)}: expected one of {values!r}, got {v!r}")
+            checks.append(check_enum)
+
+        if "const" in schema:
+            const = schema["const"]
+
+            def check_const(v, path, errors):
+                if v != const:
+                    errors.append(f"{_fmt_path(path)}: expected {const!r}, got {v!r}")
+            checks.append(check_const)
+
+        checks.extend(self._compile_object(schema, where))
+        checks.extend(self._compile_array(schema, where))
+        checks.extend(_compile_string(schema, where))
+        checks.extend(_compile_number(schema, where))
+        checks.extend(self._compile_combinators(schema, where))
+
+        checks = [c for c in checks if c is not None]
+
+        if type_check is None and len(checks) == 1:
+            return checks[0]
+
+        def check(v, path, errors):
+            if type_check is not None and not type_check(v, path, errors):
+                return
+            for c in checks:
+                c(v, path, errors)
+
+        return check
+
+
+    def _compile_ref(self, ref: str, where: str) -> Check:
+        if ref not in self._defs:
+            raise GeneratorError(f"unresolved schema reference '{ref}' at '{where}'")
+
+        # Resolved on first use, so definitions may refer to themselves.
+        def check_ref(v, path, errors):
+            if ref not in self._compiled_defs:
+                self._compiled_defs[ref] = self._compile(self._defs[ref], ref)
+            c = self._compiled_defs[ref]
+            if c is not None:
+                c(v, path, errors)
+
+        return check_ref
+
+
+    def _compile_object(self, schema: MappingType[str, Any], where: str) -> List[Check]:
+        checks = []
+
+        required = list(schema.get("required") or ())
+        if required:
+            def check_required(v, path, errors):
+                if isinstance(v, Mapping):
+                    for k in required:
+                        if k not in v:
+                            errors.append(f"{_fmt_path(path)}: missing required property '{k}'")
+            checks.append(check_required)
+
+        if "minProperties" in schema:
+            n_min = schema["minProperties"]
+
+            def check_min_properties(v, path, errors):
+                if isinstance(v, Mapping) and len(v) < n_min:
+                    errors.append(f"{_fmt_path(path)}: expected at least {n_min} properties")
+            checks.append(check_min_properties)
+
+        if "maxProperties" in schema:
+            n_max = schema["maxProperties"]
+
+            def check_max_properties(v, path, errors):
+                if isinstance(v, Mapping) and len(v) > n_max:
+                    errors.append(f"{_fmt_path(path)}: expected at most {n_max} properties")
+            checks.append(check_max_properties)
+
+        properties = {
+            k: self._compile(s, f"{where}/properties/{k}") for k, s in (schema.get("properties") or {}).items()
+        }
+        additional = schema.get("additionalProperties", True)
+        additional_check = self._compile(additional, f"{where}/additionalProperties")
+
+        if any(c is not None for c in properties.values()) or additional is not True:
+            def check_properties(v, path, errors):
+                if not isinstance(v, Mapping):
+                    return
+                for k, item in v.items():
+                    if k in properties:
+                        c = properties[k]
+                    else:
+                        c = additional_check
+                    if c is not None:
+                        c(item, _join_key(path, k), errors)
+            checks.append(check_properties)
+
+        return checks
+
+
+    def _compile_array(self, schema: MappingType[str, Any], where: str) -> List[Check]:
+        checks = []
+
+        items = self._compile(schema.get("items", True), f"{where}/items")
+        if items is not None:
+            def check_items(v, path, errors):
+                if isinstance(v, (list, tuple)):
+                    for i, item in enumerate(v):
+                        items(item, f"{path}[{i}]", errors)
+            checks.append(check_items)
+
+        if "minItems" in schema:
+            n = schema["minItems"]
+
+            def check_min_items(v, path, errors):
+                if isinstance(v, (list, tuple)) and len(v) < n:
+                    errors.append(f"{_fmt_path(path)}: expected at least {n} items")
+            checks.append(check_min_items)
+
+        if "maxItems" in schema:
+            n = schema["maxItems"]
+
+            def check_max_items(v, path, errors):
+                if isinstance(v, (list, tuple)) and len(v) > n:
+                    errors.append(f"{_fmt_path(path)}: expected at most {n} items")
+            checks.append(check_max_items)
+
+        return checks
+
+
+    def _compile_combinators(self, schema: MappingType[str, Any], where: str) -> List[Check]:
+        checks = []
+
+        if "allOf" in schema:
+            for i, s in enumerate(schema["allOf"]):
+                checks.append(self._compile(s, f"{where}/allOf/{i}"))
+
+        if "anyOf" in schema:
+            options = [self._compile(s, f"{where}/anyOf/{i}") for i, s in enumerate(schema["anyOf"])]
+
+            def check_any_of(v, path, errors):
+                for c in options:
+                    option_errors = []
+                    if c is not None:
+                        c(v, path, option_errors)
+                    if not option_errors:
+                        return
+                errors.append(f"{_fmt_path(path)}: does not match any of the allowed schemas")
+            checks.append(check_any_of)
+
+        return checks
+
+
+def compile_schema(schema: Union[MappingType[str, Any], Validator]) -> Validator:
+    """Compile a schema, given as dict, into a validator."""
+
+    if isinstance(schema, Validator):
+        return schema
+    return Validator(schema)
+
+
+def _check_keyword_types(schema: MappingType[str, Any], where: str) -> None:
+    type_spec = schema["type"]
+    names = {type_spec} if isinstance(type_spec, str) else set(type_spec)
+
+    for keyword in schema:
+        types = _KEYWORD_TYPES.get(keyword)
+        if types is not None and names.isdisjoint(types):
+            raise GeneratorError(
+                f"schema keyword '{keyword}' at '{where}' does not apply to type {' or '.join(sorted(names))}"
+            )
+
+
+def _compile_type(type_spec: Union[str, List[str]], where: str) -> Callable[[Any, str, List[str]], bool]:
+    names = [type_spec] if isinstance(type_spec, str) else list(type_spec)
+    for name in names:
+        if name not in _TYPES:
+            raise GeneratorError(f"unknown schema type '{name}' at '{where}'")
+
+    tests = [_TYPES[name] for name in names]
+    expected = " or ".join(names)
+
+    def check_type(v, path, errors):
+        for test in tests:
+            if test(v):
+                return True
+        errors.append(f"{_fmt_path(path)}: expected {expected}, got {_type_name(v)}")
+        return False
+
+    return check_type
+
+
+def _compile_string(schema: MappingType[str, Any], where: str) -> List[Check]:
+    checks = []
+
+    if "minLength" in schema:
+        n = schema["minLength"]
+
+        def check_min_length(v, path, errors):
+            if isinstance(v, str) and len(v) < n:
+                errors.append(f"{_fmt_path(path)}: expected at least {n} characters")
+        checks.append(check_min_length)
+
+    if "maxLength" in schema:
+        n = schema["maxLength"]
+
+        def check_max_length(v, path, errors):
+            if isinstance(v, str) and len(v) > n:
+                errors.append(f"{_fmt_path(path)}: expected at most {n} characters")
+        checks.append(check_max_length)
+
+    if "pattern" in schema:
+        pattern = schema["pattern"]
+        try:
+            regex = re.compile(pattern)
+        except re.error as e:
+            raise GeneratorError(f"invalid schema pattern at '{where}': {e}")
+
+        def check_pattern(v, path, errors):
+            if isinstance(v, str) and regex.search(v) is None:
+                errors.append(f"{_fmt_path(path)}: '{v}' does not match pattern '{pattern}'")
+        checks.append(check_pattern)
+
+    return checks
+
+
+def _compile_number(schema: MappingType[str, Any], where: str) -> List[Check]:
+    checks = []
+
+    if "minimum" in schema:
+        n = schema["minimum"]
+
+        def check_minimum(v, path, errors):
+            if _TYPES["number"](v) and v < n:
+                errors.append(f"{_fmt_path(path)}: expected at least {n}, got {v}")
+        checks.append(check_minimum)
+
+    if "maximum" in schema:
+        n = schema["maximum"]
+
+        def check_maximum(v, path, errors):
+            if _TYPES["number"](v) and v > n:
+                errors.append(f"{_fmt_path(path)}: expected at most {n}, got {v}")
+        checks.append(check_maximum)
+
+    return checks
+
+
+def _join_key(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _fmt_path(path: str) -> str:
+    return path or "(document)"
+
+
+def _type_name(v: Any) -> str:
+    for name, test in _TYPES.items():
+        if test(v):
+            return name
+    return type(v).__name__
@@ -1,15 +1,43 @@
 """Internal templating utilities using and extending Jinja."""
 
+import hashlib
+import io
+import itertools
 import os
+import pickle
+import threading
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+from collections import OrderedDict
 from collections.abc import Callable
 
 from dataclasses import dataclass
+from enum import Enum
 
-from jinja2 import Environment, FunctionLoader, select_autoescape, TemplateNotFound, nodes
+from jinja2 import BaseLoader, Environment, FunctionLoader, select_autoescape, TemplateNotFound, \
+    TemplateRuntimeError, TemplateSyntaxError, nodes
 from jinja2.ext import Extension
 
+from . import naming
+
+
+class ReloadMode(Enum):
+    """Strategies to detect modified template files."""
+    ALWAYS = 1
+    PER_RUN = 2
+    NEVER = 3
+
+
+class RenderState(threading.local):
+    """Per-thread state of the current render, so environments can be shared between threads."""
+
+    def __init__(self):
+        self.output_path = ""
+        self.backend = None
+        self.section_data = None
+        self.fragment_cache_hits = 0
+        self.fragment_cache_misses = 0
+
 
 class SectionExtension(Extension):
     tags = {"section"}
@@ -18,8 +46,7 @@ class SectionExtension(Extension):
         super().__init__(environment)
 
         environment.extend(
-            section_data=None,
-            section_output_path="",
+            render_state=RenderState(),
             section_delim_selector=None
         )
 
@@ -35,13 +62,14 @@ class SectionExtension(Extension):
 
 
     def _section_lookup(self, name, caller) -> str:
-        output_path = self.environment.section_output_path 
+        state = self.environment.render_state
+        output_path = state.output_path
         delim = self.environment.section_delim_selector(output_path)
 
-        if self.environment.section_data == None:
-            self.environment.section_data = load_section_data(output_path, delim)
+        if state.section_data == None:
+            state.section_data = load_section_data(output_path, delim, state.backend)
         
-        sd = self.environment.section_data.get(name)
+        sd = state.section_data.get(name)
         if sd == None:
             content = caller()
         else:
@@ -54,25 +82,183 @@ class SectionExtension(Extension):
         return indent + marker + '\n' + content + indent + marker
 
 
-def make_new_env(delim, filters) -> Environment:
+class FragmentCache:
+    """Rendered fragments of {% cache %} blocks, evicted in least recently used order.
+
+    Entries of modified templates are never hit again, so the bound also
+    removes them when the cache is kept between runs."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key: Any) -> Optional[str]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+
+    def put(self, key: Any, content: str) -> None:
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    _block_ids = itertools.count()
+
+    def __init__(self, environment):
+        super().__init__(environment)
+
+        environment.extend(
+            render_state=RenderState(),
+            fragment_cache=FragmentCache(),
+            fragment_cache_keep=False
+        )
+
+
+    def parse(self, parser) -> Any:
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+
+        for node in nodes.Scope(body).find_all(nodes.ExtensionAttribute):
+            if node.name == "_section_lookup":
+                raise TemplateSyntaxError(
+                    "section blocks are not allowed within cache blocks",
+                    lineno, parser.name, parser.filename
+                )
+
+        # Unique per compiled block, so entries from modified templates are never hit.
+        block_id = nodes.Const(next(self._block_ids))
+
+        return nodes.CallBlock(
+            self.call_method("_cache_lookup", [block_id, key]), [], [], body
+        ).set_lineno(lineno)
+
+
+    def _cache_lookup(self, block_id, key, caller) -> str:
+        cache = self.environment.fragment_cache
+        k = (block_id, _fragment_key(key))
+
+        content = cache.get(k)
+        if content is None:
+            content = caller()
+            cache.put(k, content)
+            self.environment.render_state.fragment_cache_misses += 1
+        else:
+            self.environment.render_state.fragment_cache_hits += 1
+
+        return content
+
+
+def _fragment_key(key: Any) -> Any:
+    """Return key if it is hashable, otherwise a digest of its pickled form, i.e. for lists."""
+
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        pass
+
+    try:
+        data = pickle.dumps(key, protocol=4)
+    except Exception as e:
+        raise TemplateRuntimeError(f"cache key of type {type(key).__name__} is neither hashable nor picklable: {e}")
+
+    return (_FragmentDigest, hashlib.sha256(data).digest())
+
+
+class _FragmentDigest:
+    """Marks digest keys, so they never compare equal to regular keys."""
+
+
+class CachedFileLoader(BaseLoader):
+    """Template loader that checks each file for modifications at most once per run."""
+
+    def __init__(self):
+        self._mtimes = {}
+
+
+    def begin_run(self) -> None:
+        self._mtimes.clear()
+
+
+    def get_source(self, environment: Environment, template: str) -> Tuple[str, str, Callable[[], bool]]:
+        try:
+            with open(template) as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                source = f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            raise TemplateNotFound(template)
+
+        self._mtimes[template] = mtime
+
+        return source, template, lambda: mtime == self._get_mtime(template)
+
+
+    def _get_mtime(self, path: str) -> float:
+        mtime = self._mtimes.get(path)
+        if mtime is None:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = -1.0
+            self._mtimes[path] = mtime
+        return mtime
+
+
+def make_new_env(delim, filters, reload_mode: ReloadMode = ReloadMode.ALWAYS) -> Environment:
+    if reload_mode == ReloadMode.ALWAYS:
+        loader = FunctionLoader(load_template)
+    else:
+        loader = CachedFileLoader()
+
     env = Environment(
-        loader=FunctionLoader(load_template),
-        extensions=[SectionExtension],
+        loader=loader,
+        extensions=[SectionExtension, FragmentCacheExtension],
         autoescape=select_autoescape(),
         trim_blocks=True,
-        lstrip_blocks=True
+        lstrip_blocks=True,
+        auto_reload=(reload_mode != ReloadMode.NEVER)
     )
 
     if delim == None:
         delim = default_section_delim
     env.section_delim_selector=delim
 
+    env.filters.update(naming.case_filters)
     if filters is not None:
         env.filters.update(filters)
 
     return env
 
 
+def begin_run(env: Environment) -> None:
+    if isinstance(env.loader, CachedFileLoader):
+        env.loader.begin_run()
+
+    if not env.fragment_cache_keep:
+        env.fragment_cache.clear()
+
+
 def default_section_delim(fn: str) -> str:
     if fn.endswith(".py"):
         return "#$section:"
@@ -97,41 +283,51 @@ class SectionData:
     referenced: bool
 
 
-def load_section_data(path: str, delim: str) -> Dict[str,SectionData]:
-    data = {}
+def load_section_data(path: str, delim: str, backend = None) -> Dict[str,SectionData]:
+    if backend is not None:
+        content = backend.read(path)
+        if content is None:
+            return {}
+        return parse_section_data(io.StringIO(content), delim)
 
     try:
         with open(path, 'r') as f:
-            while True:
-                s = f.readline()
-                if s == "":
-                    break
-                
-                delim_idx = s.find(delim)
-                if delim_idx == -1:
-                    continue
-
-                section_name = s[delim_idx+len(delim):].strip()
-
-                buf = ""
-
-                while True:
-                    s = f.readline()
-                    if s == "":
-                        break
-
-                    delim_idx = s.find(delim)
-                    if delim_idx == -1:
-                        buf += s
-                        continue
-
-                    if section_name != s[delim_idx+len(delim):].strip():
-                        break
-
-                    data[section_name] = SectionData(content=buf, referenced=False)
-                    break
+            return parse_section_data(f, delim)
     except IOError:
-        pass
+        return {}
+
+
+def parse_section_data(f: TextIO, delim: str) -> Dict[str,SectionData]:
+    data = {}
+
+    while True:
+        s = f.readline()
+        if s == "":
+            break
+        
+        delim_idx = s.find(delim)
+        if delim_idx == -1:
+            continue
+
+        section_name = s[delim_idx+len(delim):].strip()
+
+        buf = ""
+
+        while True:
+            s = f.readline()
+            if s == "":
+                break
+
+            delim_idx = s.find(delim)
+            if delim_idx == -1:
+                buf += s
+                continue
+
+            if section_name != s[delim_idx+len(delim):].strip():
+                break
+
+            data[section_name] = SectionData(content=buf, referenced=False)
+            break
     
     return data
 
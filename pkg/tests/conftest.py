@@ -0,0 +1,27 @@
+import pytest
+
+import snapi
+
+
+@pytest.fixture
+def make_generator(tmp_path, monkeypatch):
+    """Return a factory for generators that run in tmp_path.
+
+    The generator reads spec.json into a single transformer "data" and writes
+    one output group "out" with out_impl. Templates are given as {path: source}."""
+
+    monkeypatch.chdir(tmp_path)
+
+    def make(out_impl, spec="{}", transform=lambda d: d, templates={}, **kwargs):
+        (tmp_path / "spec.json").write_text(spec)
+        for path, source in templates.items():
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_text(source)
+
+        g = snapi.Generator(**kwargs)
+        g.add_inputs("spec", snapi.inputs.from_single_file, {"file_path": "spec.json"})
+        g.add_transformer("data", "spec", lambda d: transform(d["spec.json"]))
+        g.add_outputs("out", "data", out_impl)
+        return g
+
+    return make
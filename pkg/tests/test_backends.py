@@ -0,0 +1,72 @@
+import pytest
+
+import snapi
+from snapi.errors import GeneratorError
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar", ".tar.gz"])
+def test_archive_carries_over_files_not_written_again(tmp_path, suffix):
+    backend = snapi.ArchiveBackend(str(tmp_path / f"out{suffix}"))
+
+    backend.open()
+    backend.write("out/a.h", "v1")
+    backend.write("out/a.h.orphaned", "user code")
+    backend.close()
+
+    backend.open()
+    assert backend.read("out/a.h.orphaned") == "user code"
+    backend.write("out/a.h", "v2")
+    backend.close()
+
+    backend.open()
+    assert backend.read("out/a.h") == "v2"
+    assert backend.read("out/a.h.orphaned") == "user code"
+    backend.close()
+
+
+def test_archive_discards_failed_run(tmp_path):
+    backend = snapi.ArchiveBackend(str(tmp_path / "out.zip"))
+
+    backend.open()
+    backend.write("a.h", "v1")
+    backend.close()
+
+    backend.open()
+    backend.write("a.h", "v2")
+    backend.close(commit=False)
+
+    backend.open()
+    assert backend.read("a.h") == "v1"
+    backend.close()
+
+
+def test_fsync_requires_default_backend():
+    with pytest.raises(GeneratorError):
+        snapi.Generator(output_backend=snapi.MemoryBackend(), fsync=True)
+
+
+def test_tar_archive_indexes_members_once(tmp_path, monkeypatch):
+    import tarfile
+
+    backend = snapi.ArchiveBackend(str(tmp_path / "out.tar"))
+    backend.open()
+    for i in range(50):
+        backend.write(f"out/{i}.h", str(i))
+    backend.close()
+
+    calls = []
+    getmembers = tarfile.TarFile.getmembers
+    monkeypatch.setattr(tarfile.TarFile, "getmembers", lambda self: calls.append(1) or getmembers(self))
+
+    backend.open()
+    assert backend.read("out/7.h") == "7"
+    assert backend.read("out/missing.h") is None
+    backend.write("out/0.h", "new")
+    backend.close()
+
+    assert len(calls) == 1
+
+    backend.open()
+    assert backend.read("out/0.h") == "new"
+    assert backend.read("out/49.h") == "49"
+    backend.close()
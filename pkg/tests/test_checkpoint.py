@@ -0,0 +1,140 @@
+import pytest
+
+import snapi
+
+
+def write_outputs(outputs, data):
+    outputs.to_file("out/a.h", "tpl/a.j", data)
+    outputs.to_file("out/b.h", "tpl/b.j", data)
+
+
+@pytest.fixture
+def make_checkpoint_generator(make_generator, tmp_path):
+    (tmp_path / "tpl").mkdir()
+
+    def make(**kwargs):
+        return make_generator(write_outputs, spec='{"name": "a"}', transform=dict, checkpoint_dir="build", **kwargs)
+
+    return make
+
+
+def test_resume_does_not_reuse_discarded_archive_writes(make_checkpoint_generator, tmp_path):
+    backend = snapi.ArchiveBackend(str(tmp_path / "out.zip"))
+    g = make_checkpoint_generator(output_backend=backend)
+
+    (tmp_path / "tpl" / "a.j").write_text("v1 {{ name }}")
+    (tmp_path / "tpl" / "b.j").write_text("b")
+    g.run()
+
+    # The failed run writes a.h=v2 to the archive, which is then discarded.
+    (tmp_path / "tpl" / "a.j").write_text("v2 {{ name }}")
+    (tmp_path / "tpl" / "b.j").write_text("{{ missing() }}")
+    with pytest.raises(Exception):
+        g.run()
+
+    (tmp_path / "tpl" / "b.j").write_text("b")
+    stats = g.run(resume=True)
+
+    backend.open()
+    assert backend.read("out/a.h") == "v2 a"
+    backend.close()
+    assert stats.outputs["out"].resumed_file_count == 0
+
+
+def test_resume_reuses_kept_outputs(make_checkpoint_generator, tmp_path):
+    backend = snapi.MemoryBackend()
+    g = make_checkpoint_generator(output_backend=backend)
+
+    (tmp_path / "tpl" / "a.j").write_text("v1 {{ name }}")
+    (tmp_path / "tpl" / "b.j").write_text("{{ missing() }}")
+    with pytest.raises(Exception):
+        g.run()
+
+    (tmp_path / "tpl" / "b.j").write_text("b")
+    stats = g.run(resume=True)
+
+    assert stats.outputs["out"].resumed_file_count == 1
+    assert backend.files() == {"out/a.h": "v1 a", "out/b.h": "b"}
+
+
+def test_clear_keeps_unrelated_files(make_checkpoint_generator, tmp_path):
+    g = make_checkpoint_generator(output_backend=snapi.MemoryBackend())
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "keep.txt").write_text("keep")
+    (tmp_path / "tpl" / "a.j").write_text("a")
+    (tmp_path / "tpl" / "b.j").write_text("b")
+
+    g.run()
+
+    assert sorted(p.name for p in (tmp_path / "build").iterdir()) == ["keep.txt"]
+    assert (tmp_path / "spec.json").exists()
+
+
+def make_transform(calls, version):
+    if version == 1:
+        def transform(spec):
+            calls.append(1)
+            return {"v": 1}
+    else:
+        def transform(spec):
+            calls.append(2)
+            return {"v": 2}
+    return transform
+
+
+def run_failed_then_resume(tmp_path, first_transform, second_transform):
+    (tmp_path / "spec.json").write_text("{}")
+    backend = snapi.MemoryBackend()
+    fail = [True]
+
+    def write(outputs, data):
+        if fail[0]:
+            raise RuntimeError("boom")
+
+    def make(transform):
+        g = snapi.Generator(checkpoint_dir="build", output_backend=backend)
+        g.add_inputs("spec", snapi.inputs.from_single_file, {"file_path": "spec.json"})
+        g.add_transformer("data", "spec", transform)
+        g.add_outputs("out", "data", write)
+        return g
+
+    with pytest.raises(RuntimeError, match="boom"):
+        make(first_transform).run()
+
+    fail[0] = False
+    make(second_transform).run(resume=True)
+
+
+def test_resume_restores_unchanged_transformer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    run_failed_then_resume(tmp_path, make_transform(calls, 1), make_transform(calls, 1))
+
+    assert calls == [1]
+
+
+def test_resume_reruns_changed_transformer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    run_failed_then_resume(tmp_path, make_transform(calls, 1), make_transform(calls, 2))
+
+    assert calls == [1, 2]
+
+
+def test_partial_delegates_are_not_checkpointed(tmp_path, monkeypatch):
+    import functools
+
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def transform(spec, version):
+        calls.append(version)
+        return {"v": version}
+
+    run_failed_then_resume(
+        tmp_path, functools.partial(transform, version=1), functools.partial(transform, version=1)
+    )
+
+    assert calls == [1, 1]
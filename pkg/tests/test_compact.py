@@ -0,0 +1,98 @@
+import sys
+
+import pytest
+
+from snapi.compact import CompactMode, FrozenDict, compact, model
+
+
+DATA = {"services": [{"name": "files", "functions": [{"name": "upload", "args": ["a", "b"]}]}]}
+
+
+def test_off_returns_data_unchanged():
+    assert compact(DATA, CompactMode.OFF) is DATA
+
+
+def test_compact():
+    data = compact(DATA, CompactMode.COMPACT)
+
+    assert data == {"services": ({"name": "files", "functions": ({"name": "upload", "args": ("a", "b")},)},)}
+    assert type(data) is dict
+    name = data["services"][0]["name"]
+    assert name is sys.intern("files")
+
+
+def test_frozen():
+    data = compact(DATA, CompactMode.FROZEN)
+
+    assert isinstance(data, FrozenDict)
+    assert isinstance(data["services"][0], FrozenDict)
+    assert data == compact(DATA, CompactMode.FROZEN)
+    assert hash(data) == hash(compact(DATA, CompactMode.FROZEN))
+    assert {data: 1}[compact(DATA, CompactMode.FROZEN)] == 1
+
+
+def test_frozen_dict_is_immutable():
+    d = FrozenDict(a=1)
+
+    assert dict(d) == {"a": 1} and len(d) == 1
+    with pytest.raises(TypeError):
+        d["b"] = 2
+    with pytest.raises(AttributeError):
+        d.x = 1
+
+
+@model
+class Base:
+    name: str
+
+    def describe(self) -> str:
+        return f"base {self.name}"
+
+    @classmethod
+    def kind(cls) -> str:
+        return "base"
+
+
+@model
+class Derived(Base):
+    args: tuple = ()
+
+    def describe(self) -> str:
+        return "derived " + super().describe()
+
+    @property
+    def arg_count(self) -> int:
+        return len(self.args)
+
+    @classmethod
+    def kind(cls) -> str:
+        return "derived " + super().kind()
+
+
+def test_model_is_slotted():
+    d = Derived("x", ("a",))
+
+    assert not hasattr(d, "__dict__")
+    assert Derived.__slots__ == ("name", "args")
+    with pytest.raises(AttributeError):
+        d.other = 1
+
+
+def test_model_supports_zero_arg_super():
+    d = Derived("x", ("a",))
+
+    assert d.describe() == "derived base x"
+    assert d.arg_count == 1
+    assert Derived.kind() == "derived base"
+
+
+def test_model_with_dataclass_arguments():
+    @model(frozen=True)
+    class Point:
+        x: int
+        y: int
+
+    p = Point(1, 2)
+    assert hash(p) == hash(Point(1, 2))
+    with pytest.raises(Exception):
+        p.x = 3
@@ -0,0 +1,83 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import snapi
+from snapi import client, daemon
+from snapi.errors import GeneratorError
+
+
+def write_file(outputs, data):
+    outputs.to_file("out/a.txt", "a.j2", data)
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited in length, so tmp_path may be too long.
+    with tempfile.TemporaryDirectory() as d:
+        yield os.path.join(d, "snapi.sock")
+
+
+def start_daemon(g, socket_path):
+    t = threading.Thread(target=daemon.serve, args=(g, socket_path), daemon=True)
+    t.start()
+
+    for _ in range(100):
+        try:
+            client.request(socket_path, "ping")
+            break
+        except OSError:
+            time.sleep(0.01)
+    return t
+
+
+def test_ping_regenerate_shutdown(make_generator, socket_path):
+    backend = snapi.MemoryBackend()
+    g = make_generator(write_file, spec='{"v": 1}', templates={"a.j2": "{{ v }}"}, output_backend=backend)
+    t = start_daemon(g, socket_path)
+
+    assert client.request(socket_path, "ping") == {"ok": True}
+
+    response = client.regenerate(socket_path)
+    assert response["ok"]
+    assert response["changed_files"] == ["out/a.txt"]
+    assert backend.files() == {"out/a.txt": "1"}
+
+    response = client.regenerate(socket_path)
+    assert response["changed_files"] == []
+
+    response = client.request(socket_path, "unknown")
+    assert not response["ok"] and "unknown command" in response["error"]
+
+    assert client.request(socket_path, "shutdown") == {"ok": True}
+    t.join(5)
+    assert not t.is_alive()
+    assert not os.path.exists(socket_path)
+
+
+def test_refuses_live_socket(make_generator, socket_path):
+    g = make_generator(write_file, templates={"a.j2": "x"}, output_backend=snapi.MemoryBackend())
+    t = start_daemon(g, socket_path)
+
+    with pytest.raises(GeneratorError, match="already listening"):
+        daemon.serve(g, socket_path)
+
+    assert client.request(socket_path, "ping") == {"ok": True}
+    client.request(socket_path, "shutdown")
+    t.join(5)
+
+
+def test_replaces_stale_socket(make_generator, socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.bind(socket_path)
+
+    g = make_generator(write_file, templates={"a.j2": "x"}, output_backend=snapi.MemoryBackend())
+    t = start_daemon(g, socket_path)
+
+    assert client.request(socket_path, "ping") == {"ok": True}
+    client.request(socket_path, "shutdown")
+    t.join(5)
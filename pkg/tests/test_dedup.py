@@ -0,0 +1,82 @@
+import os
+
+import snapi
+
+
+SPEC = '{"n": 10}'
+TEMPLATES = {"file.j2": "value {{ i }}"}
+
+
+def get_n(spec):
+    return spec["n"]
+
+
+def write_pairs(outputs, n):
+    outputs.to_files((f"out/{i}.txt", "file.j2", {"i": i % 2}) for i in range(n))
+
+
+def test_render_dedup(make_generator):
+    backend = snapi.MemoryBackend()
+    g = make_generator(write_pairs, SPEC, get_n, TEMPLATES, output_backend=backend, dedup=snapi.DedupMode.RENDER)
+    stats = g.run()
+
+    assert stats.outputs["out"].dedup_render_count == 8
+    assert stats.outputs["out"].dedup_file_count == 0
+    assert backend.files()["out/8.txt"] == "value 0"
+    assert backend.files()["out/9.txt"] == "value 1"
+
+    # Renders are not carried over to the next run.
+    stats = g.run()
+    assert stats.outputs["out"].dedup_render_count == 8
+
+
+def test_render_dedup_is_shared_between_output_groups(make_generator):
+    def write_first(outputs, n):
+        outputs.to_file("a/0.txt", "file.j2", {"i": 0})
+
+    def write_second(outputs, n):
+        outputs.to_file("b/0.txt", "file.j2", {"i": 0})
+
+    backend = snapi.MemoryBackend()
+    g = make_generator(write_first, SPEC, get_n, TEMPLATES, output_backend=backend, dedup=snapi.DedupMode.RENDER)
+    g.add_outputs("second", "data", write_second)
+    stats = g.run()
+
+    assert stats.outputs["out"].dedup_render_count == 0
+    assert stats.outputs["second"].dedup_render_count == 1
+
+
+def test_hardlink_dedup(make_generator):
+    g = make_generator(write_pairs, SPEC, get_n, TEMPLATES, dedup=snapi.DedupMode.HARDLINK)
+    stats = g.run()
+
+    assert stats.outputs["out"].dedup_file_count == 8
+    assert os.path.samefile("out/0.txt", "out/8.txt")
+    assert os.path.samefile("out/1.txt", "out/9.txt")
+    assert not os.path.samefile("out/0.txt", "out/1.txt")
+    assert os.stat("out/0.txt").st_nlink == 5
+    with open("out/8.txt") as f:
+        assert f.read() == "value 0"
+
+    stats = g.run()
+    assert stats.outputs["out"].written_file_count == 0
+    assert stats.outputs["out"].unchanged_file_count == 10
+
+
+def test_symlink_dedup(make_generator):
+    g = make_generator(write_pairs, SPEC, get_n, TEMPLATES, dedup=snapi.DedupMode.SYMLINK)
+    stats = g.run()
+
+    assert stats.outputs["out"].dedup_file_count == 8
+    canonical = [p for p in (f"out/{i}.txt" for i in range(10)) if not os.path.islink(p)]
+    assert len(canonical) == 2
+
+    for i in range(10):
+        path = f"out/{i}.txt"
+        if os.path.islink(path):
+            assert not os.path.isabs(os.readlink(path))
+        with open(path) as f:
+            assert f.read() == f"value {i % 2}"
+
+    stats = g.run()
+    assert stats.outputs["out"].written_file_count == 0
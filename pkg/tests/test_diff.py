@@ -0,0 +1,147 @@
+import copy
+
+import pytest
+
+from snapi import diff
+
+
+SPEC = {
+    "spec/files.yml": {
+        "services": [
+            {
+                "name": "files",
+                "functions": [
+                    {
+                        "name": "list_dir",
+                        "args": [
+                            {"remote_path": "string = \"/\""},
+                            {"recursive": "bool"}
+                        ],
+                        "returns": "list<string>"
+                    },
+                    {
+                        "name": "count",
+                        "returns": "int"
+                    }
+                ]
+            }
+        ]
+    }
+}
+
+
+def changed_spec(fn):
+    spec = copy.deepcopy(SPEC)
+    fn(spec["spec/files.yml"]["services"][0])
+    return spec
+
+
+@pytest.mark.parametrize("s, expected", [
+    ("list< string >", "list<string>"),
+    ("map<string, list<int>>", "map<string,list<int>>"),
+    ("string[]", "string[]"),
+    ("int?", "int?"),
+    ("std::string", "std::string"),
+    ("unsigned  int", "unsigned int"),
+    ("list<string", "list<string"),
+])
+def test_normalize_type(s, expected):
+    assert diff.normalize_type(s) == expected
+
+
+def test_unchanged():
+    assert diff.diff_inputs(SPEC, copy.deepcopy(SPEC)) == []
+
+
+def test_arg_type_suffix_is_breaking():
+    def change(service):
+        service["functions"][0]["args"][1] = {"recursive": "bool[]"}
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.path, c.breaking, c.attrs) for c in changes] == [("files/files/list_dir/recursive", True, ["type"])]
+
+
+def test_return_type_suffix_is_breaking():
+    def change(service):
+        service["functions"][1]["returns"] = "int?"
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.path, c.breaking, c.attrs) for c in changes] == [("files/files/count", True, ["returns"])]
+
+
+def test_description_is_not_breaking():
+    def change(service):
+        service["description"] = "File access."
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.kind, c.path, c.breaking, c.attrs) for c in changes] == [
+        ("changed", "files/files", False, ["description"])
+    ]
+    assert diff.is_backward_compatible(changes)
+
+
+def test_removed_default_is_breaking():
+    def change(service):
+        service["functions"][0]["args"][0] = {"remote_path": "string"}
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.path, c.breaking) for c in changes] == [("files/files/list_dir/remote_path", True)]
+
+
+def test_added_default_is_not_breaking():
+    def change(service):
+        service["functions"][0]["args"][1] = {"recursive": "bool = false"}
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.path, c.breaking) for c in changes] == [("files/files/list_dir/recursive", False)]
+
+
+def test_reordered_args_are_breaking():
+    def change(service):
+        service["functions"][0]["args"].reverse()
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert len(changes) == 2
+    assert all(c.breaking and c.attrs == ["position"] for c in changes)
+
+
+def test_added_args():
+    def change(service):
+        service["functions"][0]["args"].append({"limit": "int = 100"})
+        service["functions"][1]["args"] = [{"filter": "string"}]
+
+    changes = {c.path: c for c in diff.diff_inputs(SPEC, changed_spec(change))}
+
+    assert changes["files/files/list_dir/limit"].kind == "added"
+    assert not changes["files/files/list_dir/limit"].breaking
+    assert changes["files/files/count/filter"].breaking
+
+
+def test_removed_function_is_breaking():
+    def change(service):
+        del service["functions"][1]
+
+    changes = diff.diff_inputs(SPEC, changed_spec(change))
+
+    assert [(c.kind, c.path, c.breaking) for c in changes] == [("removed", "files/files/count", True)]
+
+
+def test_saved_tree(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    diff.save_tree(diff.hash_spec(SPEC), path)
+    baseline = diff.load_tree(path)
+
+    def change(service):
+        service["description"] = "File access."
+        service["functions"][1]["returns"] = "long"
+
+    new = changed_spec(change)
+
+    assert diff.diff(baseline, diff.hash_spec(SPEC)) == []
+    assert diff.diff(baseline, diff.hash_spec(new)) == diff.diff_inputs(SPEC, new)
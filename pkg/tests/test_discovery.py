@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+import pytest
+
+from snapi import discovery
+
+
+def make_tree(root, paths):
+    for p in paths:
+        path = root / p
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+
+def rel_paths(root, paths):
+    return [os.path.relpath(p, root).replace(os.sep, "/") for p in paths]
+
+
+def age_dirs(root, seconds=60):
+    t = time.time() - seconds
+    for dir_path, _, _ in os.walk(root):
+        os.utime(dir_path, (t, t))
+
+
+@pytest.mark.parametrize("pattern, path, name, matched", [
+    ("*.yml", "a/b/c.yml", "c.yml", True),
+    ("*.yml", "a/b/c.yaml", "c.yaml", False),
+    ("a/*.yml", "a/c.yml", "c.yml", True),
+    ("a/*.yml", "a/b/c.yml", "c.yml", False),
+    ("a/*.yml", "x/a/c.yml", "c.yml", False),
+    ("**/c.yml", "c.yml", "c.yml", True),
+    ("**/c.yml", "a/b/c.yml", "c.yml", True),
+    ("a/**/c.yml", "a/c.yml", "c.yml", True),
+    ("a/**/c.yml", "a/b/d/c.yml", "c.yml", True),
+    ("a/**", "a/b/c.yml", "c.yml", True),
+    ("a/**", "b/a/c.yml", "c.yml", False),
+    ("/c.yml", "c.yml", "c.yml", True),
+    ("?.yml", "c.yml", "c.yml", True),
+    ("a?c.yml", "a/c.yml", "c.yml", False),
+    ("[!c].yml", "d.yml", "d.yml", True),
+    ("[!c].yml", "c.yml", "c.yml", False),
+])
+def test_matcher(pattern, path, name, matched):
+    assert discovery.Matcher([pattern]).match(path, name) == matched
+
+
+def test_find_files_prunes_excluded_dirs(tmp_path, monkeypatch):
+    make_tree(tmp_path, [
+        "a.yml", "b.txt", "sub/c.yml", "sub/node_modules/d.yml", "node_modules/e.yml",
+        "vendor/f.yml", "sub/vendor/g.yml", "build/h.yml"
+    ])
+
+    scanned = []
+    scan_dir = discovery._scan_dir
+    monkeypatch.setattr(discovery, "_scan_dir", lambda a, r, *args: scanned.append(r) or scan_dir(a, r, *args))
+
+    paths = discovery.find_files(str(tmp_path), ["*.yml"], ["node_modules", "vendor/", "build/**"])
+
+    assert rel_paths(tmp_path, paths) == ["a.yml", "sub/c.yml", "sub/vendor/g.yml"]
+    assert sorted(scanned) == ["", "sub", "sub/vendor"]
+
+
+def test_find_files_not_recursive(tmp_path):
+    make_tree(tmp_path, ["a.yml", "sub/b.yml"])
+
+    paths = discovery.find_files(str(tmp_path), ["*.yml"], recursive=False)
+
+    assert rel_paths(tmp_path, paths) == ["a.yml"]
+
+
+def test_snapshot_skips_unchanged_dirs(tmp_path, monkeypatch):
+    root = tmp_path / "in"
+    snapshot_path = str(tmp_path / "snapshot.json")
+    make_tree(root, ["a.yml", "sub/b.yml", "other/c.yml"])
+    age_dirs(root)
+
+    assert len(discovery.find_files(str(root), snapshot_path=snapshot_path)) == 3
+
+    scanned = []
+    scan_dir = discovery._scan_dir
+    monkeypatch.setattr(discovery, "_scan_dir", lambda a, r, *args: scanned.append(r) or scan_dir(a, r, *args))
+
+    assert len(discovery.find_files(str(root), snapshot_path=snapshot_path)) == 3
+    assert scanned == []
+
+    (root / "sub" / "d.yml").write_text("")
+    paths = discovery.find_files(str(root), snapshot_path=snapshot_path)
+
+    assert rel_paths(root, paths) == ["a.yml", "other/c.yml", "sub/b.yml", "sub/d.yml"]
+    assert scanned == ["sub"]
+
+
+def test_snapshot_is_discarded_on_config_change(tmp_path):
+    root = tmp_path / "in"
+    snapshot_path = str(tmp_path / "snapshot.json")
+    make_tree(root, ["a.yml", "b.txt"])
+    age_dirs(root)
+
+    assert len(discovery.find_files(str(root), ["*.yml"], snapshot_path=snapshot_path)) == 1
+    assert len(discovery.find_files(str(root), ["*.txt"], snapshot_path=snapshot_path)) == 1
+
+
+def test_snapshot_does_not_trust_racy_entries(tmp_path):
+    root = tmp_path / "in"
+    snapshot_path = str(tmp_path / "snapshot.json")
+    make_tree(root, ["a.yml"])
+
+    assert len(discovery.find_files(str(root), snapshot_path=snapshot_path)) == 1
+    with open(snapshot_path) as f:
+        first_time = json.load(f).get("time", 0)
+
+    # A file added within the mtime resolution leaves the directory mtime unchanged.
+    mtime = os.stat(root).st_mtime_ns
+    (root / "b.yml").write_text("")
+    os.utime(root, ns=(mtime, mtime))
+
+    assert len(discovery.find_files(str(root), snapshot_path=snapshot_path)) == 2
+
+    # The snapshot is saved again, so that the entry is trusted once it is old enough.
+    with open(snapshot_path) as f:
+        assert json.load(f)["time"] > first_time
@@ -0,0 +1,79 @@
+import pytest
+
+import snapi
+from snapi import formatting
+from snapi.errors import GeneratorError
+
+
+UPPER = ["tr", "a-z", "A-Z"]
+
+
+class Log:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, s):
+        self.errors.append(s)
+
+
+def test_format_batch_uses_cache():
+    p = formatting.PostProcessor({".txt": UPPER})
+    items = [("a.txt", "abc", UPPER), ("b.txt", "def", UPPER)]
+
+    assert p.format_batch(items, Log()) == (["ABC", "DEF"], 0)
+    assert p.format_batch(items, Log()) == (["ABC", "DEF"], 2)
+
+
+def test_format_batch_reports_failures():
+    p = formatting.PostProcessor({".txt": ["false"]})
+    log = Log()
+
+    contents, hits = p.format_batch([("a.txt", "abc", ["false"])], log)
+
+    assert contents == [None]
+    assert len(log.errors) == 1 and "exit code 1" in log.errors[0]
+
+
+def test_save_cache_only_writes_changes(tmp_path):
+    cache_path = tmp_path / "format_cache.json"
+    items = [("a.txt", "abc", UPPER)]
+
+    p = formatting.PostProcessor({".txt": UPPER}, str(cache_path))
+    p.format_batch(items, Log())
+    p.save_cache()
+    assert cache_path.exists()
+
+    p = formatting.PostProcessor({".txt": UPPER}, str(cache_path))
+    p.format_batch(items, Log())
+    cache_path.unlink()
+    p.save_cache()
+    assert not cache_path.exists()
+
+    # Dropping the unused entry is a change.
+    p.format_batch([("b.txt", "def", UPPER)], Log())
+    p.save_cache()
+    assert cache_path.exists()
+
+
+def write_file(outputs, data):
+    outputs.to_file("out/a.txt", "a.j2", {})
+
+
+def test_formatter_failure_fails_run(make_generator):
+    backend = snapi.MemoryBackend()
+    g = make_generator(write_file, templates={"a.j2": "abc"}, formatters={".txt": ["false"]}, output_backend=backend)
+
+    with pytest.raises(GeneratorError, match="formatting failed"):
+        g.run()
+
+    assert backend.files() == {}
+
+
+def test_formatted_outputs(make_generator):
+    backend = snapi.MemoryBackend()
+    g = make_generator(write_file, templates={"a.j2": "abc"}, formatters={".txt": UPPER}, output_backend=backend)
+
+    stats = g.run()
+
+    assert backend.files() == {"out/a.txt": "ABC"}
+    assert stats.outputs["out"].formatted_file_count == 1
@@ -0,0 +1,58 @@
+import pytest
+
+from snapi import naming
+
+
+@pytest.mark.parametrize("s, words", [
+    ("list_dir", ("list", "dir")),
+    ("HTTPServer", ("HTTP", "Server")),
+    ("userID", ("user", "ID")),
+    ("IPv6Address", ("I", "Pv6", "Address")),
+    ("fooBARBaz", ("foo", "BAR", "Baz")),
+    ("HTTPServer_v2", ("HTTP", "Server", "v2")),
+    ("ABC2", ("ABC2",)),
+    ("2fast", ("2fast",)),
+    ("", ()),
+    ("__", ()),
+    ("ÄpfelBaum", ("Äpfel", "Baum")),
+    ("straße_länge", ("straße", "länge")),
+    ("ÜBERServer", ("ÜBER", "Server")),
+    ("日本語Name", ("日本語", "Name")),
+])
+def test_split_words(s, words):
+    assert naming.split_words(s) == words
+
+
+@pytest.mark.parametrize("s", [
+    "list_dir", "HTTPServer", "userID", "IPv6Address", "getUserName", "v2_api",
+    "fooBARBaz", "ABC2", "A", "aB", "ABc", "ABCd2E", "x__y--z", "9Lives", ""
+])
+def test_unicode_split_matches_ascii_split(s):
+    assert naming._split_unicode_words(s) == tuple(naming._WORD_RE.findall(s))
+
+
+@pytest.mark.parametrize("name, s, expected", [
+    ("snake_case", "getUserName", "get_user_name"),
+    ("snake_case", "HTTPServer", "http_server"),
+    ("snake_case", "request_timeout_ms2", "request_timeout_ms2"),
+    ("snake_case", "ÄpfelBaum", "äpfel_baum"),
+    ("snake_case", "", ""),
+    ("screaming_case", "userID", "USER_ID"),
+    ("screaming_case", "v2_api", "V2_API"),
+    ("screaming_case", "straßeLänge", "STRASSE_LÄNGE"),
+    ("screaming_case", "", ""),
+    ("kebab_case", "ListDirResponse", "list-dir-response"),
+    ("kebab_case", "IPv6Address", "i-pv6-address"),
+    ("kebab_case", "ÜBERServer", "über-server"),
+    ("kebab_case", "", ""),
+    ("pascal_case", "list_dir", "ListDir"),
+    ("pascal_case", "http_server2", "HttpServer2"),
+    ("pascal_case", "äpfel_baum", "ÄpfelBaum"),
+    ("pascal_case", "", ""),
+    ("camel_case", "ListDirResponse", "listDirResponse"),
+    ("camel_case", "HTTP_SERVER", "httpServer"),
+    ("camel_case", "Äpfel_baum", "äpfelBaum"),
+    ("camel_case", "", ""),
+])
+def test_case_filters(name, s, expected):
+    assert naming.case_filters[name](s) == expected
@@ -0,0 +1,149 @@
+import pytest
+
+import snapi
+
+
+SPEC = '{"n": 300}'
+TEMPLATES = {"file.j2": "{{ i }}"}
+
+
+def get_n(spec):
+    return spec["n"]
+
+
+def test_to_files_with_lazy_items(make_generator):
+    def items(n):
+        for i in range(n):
+            yield f"out/{i}.txt", "file.j2", {"i": i}
+
+    def write(outputs, n):
+        outputs.to_files(items(n))
+
+    backend = snapi.MemoryBackend()
+    g = make_generator(write, SPEC, get_n, TEMPLATES, output_backend=backend, writer_threads=2)
+    stats = g.run()
+
+    assert stats.outputs["out"].written_file_count == 300
+    assert backend.files()["out/299.txt"] == "299"
+
+
+def test_failed_output_group_drains_writer(make_generator):
+    captured = []
+
+    def items(n):
+        for i in range(n):
+            if i == snapi.Outputs.FILES_CHUNK_SIZE + 10:
+                raise RuntimeError("boom")
+            yield f"out/{i}.txt", "file.j2", {"i": i}
+
+    def write(outputs, n):
+        captured.append(outputs)
+        outputs.to_files(items(n))
+
+    backend = snapi.MemoryBackend()
+    g = make_generator(write, SPEC, get_n, TEMPLATES, output_backend=backend, writer_threads=2)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        g.run()
+
+    outputs = captured[0]
+    assert outputs._writer is None
+    assert len(outputs._pending_writes) == 0
+    # Files of the completed chunk were written before the backend was closed.
+    assert len(backend.files()) == snapi.Outputs.FILES_CHUNK_SIZE
+
+
+class FailingBackend(snapi.MemoryBackend):
+    def __init__(self, fail_path):
+        super().__init__()
+        self.fail_path = fail_path
+
+
+    def write(self, path, content):
+        if path == self.fail_path:
+            raise OSError(f"cannot write {path}")
+        super().write(path, content)
+
+
+def test_pending_writes_are_bounded(make_generator, monkeypatch):
+    monkeypatch.setattr(snapi.Outputs, "MAX_PENDING_WRITES", 8)
+    captured = []
+    max_pending = []
+
+    def items(n):
+        for i in range(n):
+            max_pending.append(len(captured[0]._pending_writes))
+            yield f"out/{i}.txt", "file.j2", {"i": i}
+
+    def write(outputs, n):
+        captured.append(outputs)
+        outputs.to_files(items(n))
+
+    backend = snapi.MemoryBackend()
+    g = make_generator(write, SPEC, get_n, TEMPLATES, output_backend=backend, writer_threads=2)
+    g.run()
+
+    assert max(max_pending) <= 8
+    assert len(backend.files()) == 300
+
+
+def test_write_error_is_raised_while_rendering(make_generator, monkeypatch):
+    monkeypatch.setattr(snapi.Outputs, "MAX_PENDING_WRITES", 8)
+    consumed = []
+
+    def items(n):
+        for i in range(n):
+            consumed.append(i)
+            yield f"out/{i}.txt", "file.j2", {"i": i}
+
+    def write(outputs, n):
+        outputs.to_files(items(n))
+
+    backend = FailingBackend("out/0.txt")
+    g = make_generator(write, SPEC, get_n, TEMPLATES, output_backend=backend, writer_threads=2)
+
+    with pytest.raises(OSError, match="cannot write out/0.txt"):
+        g.run()
+
+    # Items are consumed in chunks, but the error stops the output group before the last one.
+    assert len(consumed) < 300
+
+
+class RecordingBackend(snapi.MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+        self.late_writes = []
+
+
+    def close(self, commit=True):
+        self.closed = True
+
+
+    def write(self, path, content):
+        if self.closed:
+            self.late_writes.append(path)
+        super().write(path, content)
+
+
+def test_arun_waits_for_sibling_output_groups(make_generator):
+    import asyncio
+    import time
+
+    def fail(outputs, n):
+        raise RuntimeError("boom")
+
+    def slow(outputs, n):
+        time.sleep(0.2)
+        outputs.to_file("out/slow.txt", "file.j2", {"i": n})
+
+    backend = RecordingBackend()
+    g = make_generator(fail, SPEC, get_n, TEMPLATES, output_backend=backend)
+    g.add_outputs("slow", "data", slow)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(g.arun())
+
+    assert backend.closed
+    assert backend.late_writes == []
+    assert backend.files()["out/slow.txt"] == "300"
@@ -0,0 +1,72 @@
+import pytest
+
+from snapi.errors import GeneratorError
+from snapi.schema import compile_schema
+
+
+ARG_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "minProperties": 1,
+        "maxProperties": 1,
+        "additionalProperties": {"type": "string"}
+    }
+}
+
+
+def test_property_count():
+    v = compile_schema(ARG_SCHEMA)
+
+    assert v([{"key": "string"}]) == []
+    assert v([{}, {"a": "int", "b": "int"}]) == [
+        "[0]: expected at least 1 properties",
+        "[1]: expected at most 1 properties"
+    ]
+
+
+def test_collects_all_errors():
+    v = compile_schema({
+        "type": "object",
+        "required": ["name"],
+        "properties": {"tags": {"type": "array", "items": {"type": "string", "pattern": "^[a-z]+$"}}}
+    })
+
+    assert v({"tags": ["ok", "Bad", 1]}) == [
+        "(document): missing required property 'name'",
+        "tags[1]: 'Bad' does not match pattern '^[a-z]+$'",
+        "tags[2]: expected string, got integer"
+    ]
+
+
+def test_recursive_ref():
+    v = compile_schema({
+        "$ref": "#/$defs/node",
+        "$defs": {
+            "node": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {"children": {"type": "array", "items": {"$ref": "#/$defs/node"}}}
+            }
+        }
+    })
+
+    assert v({"name": "a", "children": [{"children": []}]}) == ["children[0]: missing required property 'name'"]
+
+
+@pytest.mark.parametrize("schema", [
+    {"type": "object", "minItems": 1},
+    {"type": "string", "properties": {}},
+    {"type": ["array", "null"], "pattern": "x"},
+    {"oneOf": []},
+])
+def test_rejects_inapplicable_or_unknown_keywords(schema):
+    with pytest.raises(GeneratorError):
+        compile_schema(schema)
+
+
+def test_keywords_of_any_declared_type():
+    v = compile_schema({"type": ["string", "array"], "minLength": 2, "minItems": 1})
+
+    assert v("ab") == [] and v(["x"]) == []
+    assert v("a") == ["(document): expected at least 2 characters"]
@@ -0,0 +1,103 @@
+import pytest
+
+from jinja2 import TemplateRuntimeError, TemplateSyntaxError
+
+from snapi import template
+from snapi.compact import model
+
+
+@model
+class Function:
+    name: str
+    args: list
+
+
+def make_env():
+    return template.make_new_env(None, None)
+
+
+def render(env, source, **data):
+    return env.from_string(source).render(**data)
+
+
+def test_cache_hits_and_misses():
+    env = make_env()
+    tpl = env.from_string("{% cache name %}{{ name }}-{{ counter() }}{% endcache %}")
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return len(calls)
+
+    assert tpl.render(name="a", counter=counter) == "a-1"
+    assert tpl.render(name="a", counter=counter) == "a-1"
+    assert tpl.render(name="b", counter=counter) == "b-2"
+
+    state = env.render_state
+    assert (state.fragment_cache_hits, state.fragment_cache_misses) == (1, 2)
+
+
+@pytest.mark.parametrize("key", [
+    ["a", "b"],
+    {"a": [1, 2]},
+    Function("f", ["x"]),
+])
+def test_cache_with_unhashable_keys(key):
+    env = make_env()
+    tpl = env.from_string("{% cache key %}{{ n }}{% endcache %}")
+
+    assert tpl.render(key=key, n=1) == "1"
+    assert tpl.render(key=key, n=2) == "1"
+    assert env.render_state.fragment_cache_hits == 1
+
+
+def test_cache_with_unpicklable_key():
+    env = make_env()
+
+    with pytest.raises(TemplateRuntimeError):
+        render(env, "{% cache key %}x{% endcache %}", key=[lambda: None])
+
+
+def test_cache_blocks_are_separate():
+    env = make_env()
+    tpl = env.from_string("{% cache 1 %}a{% endcache %}{% cache 1 %}b{% endcache %}")
+
+    assert tpl.render() == "ab"
+
+
+def test_sections_are_not_allowed_in_cache_blocks():
+    with pytest.raises(TemplateSyntaxError):
+        make_env().from_string('{% cache 1 %}{% section "s" %}x{% endsection %}{% endcache %}')
+
+
+def test_cache_is_bounded():
+    env = make_env()
+    env.fragment_cache.max_size = 2
+    tpl = env.from_string("{% cache key %}{{ key }}{% endcache %}")
+
+    for key in range(5):
+        tpl.render(key=key)
+
+    assert len(env.fragment_cache) == 2
+
+    # 3 is used again, so 4 is evicted when 5 is added.
+    tpl.render(key=3)
+    tpl.render(key=5)
+    hits = env.render_state.fragment_cache_hits
+    tpl.render(key=3)
+    tpl.render(key=4)
+    assert env.render_state.fragment_cache_hits == hits + 1
+
+
+def test_begin_run_clears_cache_unless_kept():
+    env = make_env()
+    tpl = env.from_string("{% cache 1 %}x{% endcache %}")
+    tpl.render()
+
+    env.fragment_cache_keep = True
+    template.begin_run(env)
+    assert len(env.fragment_cache) == 1
+
+    env.fragment_cache_keep = False
+    template.begin_run(env)
+    assert len(env.fragment_cache) == 0